@@ -0,0 +1,489 @@
+#!/usr/bin/env python3
+"""Benchmarks for the color pipeline and the daemon's update tick.
+
+Everything runs offline: the tick benchmarks read a fake hwmon tree and
+write either to stand-in devices or, for tick_sdk, over real SDK connections
+to a fakeserver on the loopback interface. Results are printed (or written with -o) as
+JSON, one entry per benchmark with the best and median time per call in
+microseconds, so runs can be compared between releases."""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import timeit
+from typing import Callable, Dict, List
+
+import color
+import lut
+
+REPEAT = 5
+
+BENCHMARKS: Dict[str, Callable[[], Callable[[], object]]] = {}
+
+def benchmark(fn: Callable[[], Callable[[], object]]):
+	"""Register FN, which sets up a benchmark and returns the callable to
+	time. If that callable has a close attribute, it is called once timing
+	is done."""
+
+	BENCHMARKS[fn.__name__] = fn
+	return fn
+
+# Scalar color pipeline.
+
+@benchmark
+def spectrum_to_xyz():
+	spec = color.bb_spectrum(5000)
+	return lambda: color.spectrum_to_xyz(spec)
+
+@benchmark
+def spectrum_to_xyz_reduced():
+	import quadrature
+
+	spec = color.bb_spectrum(5000)
+	quad = quadrature.get('reduced:21')
+	return lambda: quad.spectrum_to_xyz(spec)
+
+@benchmark
+def spectrum_to_xyz_analytic():
+	import quadrature
+
+	spec = color.bb_spectrum(5000)
+	quad = quadrature.get('analytic:16')
+	return lambda: quad.spectrum_to_xyz(spec)
+
+@benchmark
+def planck_kernel():
+	"""Planck's law at all 81 table wavelengths, for a new temperature each
+	call."""
+
+	temps = iter(range(1000, 10**9))
+	return lambda: color.PLANCK(next(temps))
+
+@benchmark
+def bb_to_xyz_table():
+	import quadrature
+
+	temps = iter(range(1000, 10**9))
+	return lambda: quadrature.TABLE.bb_to_xyz(next(temps))
+
+@benchmark
+def planckian_xy():
+	return lambda: color.planckian_xy(5000)
+
+@benchmark
+def xyz_to_rgb():
+	return lambda: color.xyz_to_rgb(color.SMPTE_SYSTEM, 0.3451, 0.3516, 0.3032)
+
+@benchmark
+def constrain_rgb():
+	return lambda: color.constrain_rgb(1.2, 0.4, -0.1)
+
+@benchmark
+def norm_rgb():
+	return lambda: color.norm_rgb(1.2, 0.4, 0.1)
+
+@benchmark
+def gamma_correct_rgb():
+	return lambda: color.gamma_correct_rgb(color.SMPTE_SYSTEM, 0.9, 0.4, 0.1)
+
+@benchmark
+def blackbody_rgb():
+	return lambda: lut.blackbody_rgb(0.37)
+
+@benchmark
+def blackbody_lut_lookup():
+	table = lut.GradientLUT(lut.blackbody_rgb)
+	return lambda: table.lookup(0.37)
+
+@benchmark
+def blackbody_lut_build():
+	return lambda: lut.GradientLUT(lut.blackbody_rgb)
+
+# Batched color pipeline, 1000 colors per call.
+
+BATCH = 1000
+
+@benchmark
+def xyz_to_rgb_batch():
+	xyzs = [(0.3451, 0.3516, 0.3032)] * BATCH
+	prepared = color.prepare_color_system(color.SMPTE_SYSTEM)
+	return lambda: prepared.apply_many(xyzs)
+
+@benchmark
+def xyz_to_rgb_array_batch():
+	import numpy as np
+	import color_array
+
+	xyzs = np.tile((0.3451, 0.3516, 0.3032), (BATCH, 1))
+	out = np.empty_like(xyzs)
+	return lambda: color_array.xyz_to_rgb(color.SMPTE_SYSTEM, xyzs, out=out)
+
+@benchmark
+def blackbody_rgb_batch():
+	"""bb_to_xyz through norm_rgb for 1000 temperatures, in one buffer."""
+
+	import numpy as np
+	import color_array
+
+	temps = np.linspace(1000, 9000, BATCH)
+
+	def run():
+		rgb = color_array.xyz_to_rgb(color.SMPTE_SYSTEM, color_array.bb_to_xyz(temps))
+		return color_array.norm_rgb(color_array.constrain_rgb(rgb, out=rgb), out=rgb)
+
+	return run
+
+@benchmark
+def bb_to_xyz_batch():
+	import numpy as np
+	import color_array
+
+	temps = np.linspace(1000, 9000, BATCH)
+	return lambda: color_array.bb_to_xyz(temps)
+
+@benchmark
+def planckian_xy_batch():
+	import numpy as np
+	import color_array
+
+	temps = np.linspace(1000, 9000, BATCH)
+	return lambda: color_array.planckian_xy(temps)
+
+@benchmark
+def spds_to_xyz_batch():
+	import numpy as np
+	import color_array
+
+	# Measured-looking spectra: 1 nm tables of a narrow LED peak each.
+	measured = np.arange(350, 801, 1.0)
+	spds = [color_array.SPD.resample(measured, np.exp(-0.5 * ((measured - peak) / 12) ** 2)) for peak in np.linspace(440, 640, BATCH)]
+	return lambda: color_array.spds_to_xyz(spds)
+
+@benchmark
+def gamma_correct_batch():
+	import numpy as np
+	import color_array
+
+	rgb = np.random.default_rng(0).random((BATCH, 3))
+	out = np.empty_like(rgb)
+	return lambda: color_array.gamma_correct(color.SMPTE_SYSTEM, rgb, out)
+
+@benchmark
+def gamma_lut_batch():
+	import numpy as np
+	import color_array
+
+	rgb = np.random.default_rng(0).random((BATCH, 3))
+	out = np.empty(rgb.shape, np.uint8)
+	table = color_array.GammaLUT(color.SMPTE_SYSTEM)
+	return lambda: table(rgb, out)
+
+# A full tick against fake hardware.
+
+def fake_hwmon(root: str, readings: Dict[str, Dict[str, int]]):
+	"""Populate ROOT as a hwmon tree with one chip per key of READINGS, each
+	with temperature sensors given as label: millidegrees."""
+
+	for i, (chip, sensors) in enumerate(readings.items()):
+		d = os.path.join(root, f'hwmon{i}')
+		os.makedirs(d)
+
+		with open(os.path.join(d, 'name'), 'w') as f:
+			f.write(chip + '\n')
+
+		for j, (label, value) in enumerate(sensors.items(), 1):
+			with open(os.path.join(d, f'temp{j}_label'), 'w') as f:
+				f.write(label + '\n')
+
+			with open(os.path.join(d, f'temp{j}_input'), 'w') as f:
+				f.write(f'{value}\n')
+
+class FakeComms:
+	"""Stands in for the client's NetworkClient (and its socket), counting
+	what is sent."""
+
+	def __init__(self):
+		import threading
+
+		self.lock = threading.Lock()
+		self.connected = True
+		self.sock = self
+		self.packets = 0
+		self.bytes = 0
+
+	def sendall(self, data, flags: int = 0):
+		self.packets += 1
+		self.bytes += len(data)
+
+	def stop_connection(self):
+		self.connected = False
+
+class FakeZone:
+	def __init__(self, name: str, id: int, device_id: int, leds: int, comms: FakeComms):
+		self.name = name
+		self.id = id
+		self.device_id = device_id
+		self.leds = [None] * leds
+		self.comms = comms
+
+class FakeDevice:
+	def __init__(self, name: str, type, id: int, zones: List[int], comms: FakeComms):
+		self.name = name
+		self.type = type
+		self.zones = [FakeZone(f'zone {i}', i, id, n, comms) for i, n in enumerate(zones)]
+
+	def set_mode(self, mode):
+		pass
+
+class FakeClient:
+	def __init__(self):
+		from openrgb.utils import DeviceType
+
+		self.comms = FakeComms()
+		self.devices = [
+			FakeDevice('Motherboard', DeviceType.MOTHERBOARD, 0, [1, 6], self.comms),
+			FakeDevice('DRAM 1', DeviceType.DRAM, 1, [5], self.comms),
+			FakeDevice('DRAM 2', DeviceType.DRAM, 2, [5], self.comms),
+			FakeDevice('GPU', DeviceType.GPU, 3, [22], self.comms),
+		]
+
+	def disconnect(self):
+		pass
+
+@benchmark
+def tick():
+	import config
+	import devices
+	import sensors
+
+	tmp = tempfile.TemporaryDirectory(prefix='bench-hwmon-')
+	root = tmp.name
+	fake_hwmon(root, {
+		'nvme': {'Composite': 38850},
+		'zenpower': {'Tdie': 52125, 'Tctl': 52125},
+		'amdgpu': {'edge': 47000},
+	})
+
+	cfg = config.parse({
+		'sensors': config.DEFAULT_CONFIG['sensors'],
+		'threshold': 0,
+		'zones': config.DEFAULT_CONFIG['zones'] + [
+			{'device_type': 'DRAM', 'source': 'cpu'},
+			{'device_type': 'GPU', 'source': 'gpu'},
+		],
+	})
+	reader = sensors.Sensors(cfg.sensors, hwmon={'root': root})
+	table = lut.GradientLUT(lut.blackbody_rgb)
+	fanout = devices.Fanout([FakeClient()], cfg, table)
+	step = [0]
+
+	def run():
+		readings = reader.read_all()
+		# Nudge the temperatures so that every tick has something to send.
+		step[0] = (step[0] + 1) % 50
+		fanout.render({
+			name: (temp + step[0] - s.min) / (s.max - s.min)
+			for name, temp in readings.items()
+			for s in (cfg.sensors[name],)
+		}, step[0] / 30)
+		fanout.write()
+
+	def close():
+		reader.close()
+		fanout.close()
+		tmp.cleanup()
+
+	run.close = close
+	return run
+
+@benchmark
+def tick_sdk():
+	"""Like tick, but writing through real SDK connections to a fakeserver
+	on the loopback interface."""
+
+	import config
+	import devices
+	import fakeserver
+	import sensors
+
+	server = fakeserver.FakeServer().start()
+	tmp = tempfile.TemporaryDirectory(prefix='bench-hwmon-')
+	fake_hwmon(tmp.name, {
+		'zenpower': {'Tdie': 52125},
+		'amdgpu': {'edge': 47000},
+	})
+
+	cfg = config.parse({
+		'sensors': config.DEFAULT_CONFIG['sensors'],
+		'threshold': 0,
+		'zones': config.DEFAULT_CONFIG['zones'] + [
+			{'device_type': 'DRAM', 'source': 'cpu'},
+			{'device_type': 'GPU', 'source': 'gpu'},
+		],
+	})
+	reader = sensors.Sensors(cfg.sensors, hwmon={'root': tmp.name})
+	table = lut.GradientLUT(lut.blackbody_rgb)
+	fanout = devices.Fanout.connect(cfg, table, port=server.port)
+	step = [0]
+
+	def run():
+		readings = reader.read_all()
+		step[0] = (step[0] + 1) % 50
+		fanout.render({
+			name: (temp + step[0] - s.min) / (s.max - s.min)
+			for name, temp in readings.items()
+			for s in (cfg.sensors[name],)
+		}, step[0] / 30)
+		fanout.write()
+
+	def close():
+		reader.close()
+		fanout.close()
+		server.stop()
+		tmp.cleanup()
+
+	run.close = close
+	return run
+
+class FakeNvml:
+	"""Stands in for pynvml, with one GPU per entry of TEMPS."""
+
+	NVML_TEMPERATURE_GPU = 0
+
+	def __init__(self, temps: List[int]):
+		self.temps = temps
+
+	def nvmlInit(self):
+		pass
+
+	def nvmlShutdown(self):
+		pass
+
+	def nvmlDeviceGetHandleByIndex(self, index: int) -> int:
+		return index
+
+	def nvmlDeviceGetTemperature(self, handle: int, sensor: int) -> int:
+		return self.temps[handle]
+
+@benchmark
+def sample():
+	"""One sampling pass over a sensor of every type but psutil: hwmon (a fake
+	tree), NVML (a stub), and CPU load, memory, disk and network from this
+	machine's /proc."""
+
+	import config
+	import sensors
+
+	tmp = tempfile.TemporaryDirectory(prefix='bench-hwmon-')
+	fake_hwmon(tmp.name, {
+		'zenpower': {'Tdie': 52125},
+		'amdgpu': {'edge': 47000},
+	})
+
+	with open('/proc/diskstats') as f:
+		disk = f.readline().split()[2]
+
+	cfg = config.parse({
+		'sensors': dict(config.DEFAULT_CONFIG['sensors'], **{
+			'nvidia': {'type': 'nvml'},
+			'load': {'type': 'cpu_load', 'min': 0, 'max': 100},
+			'memory': {'type': 'memory', 'min': 0, 'max': 100},
+			'disk': {'type': 'disk', 'device': disk, 'min': 0, 'max': 1000},
+			'net': {'type': 'net', 'interface': 'lo', 'min': 0, 'max': 100},
+		}),
+	})
+	reader = sensors.Sensors(cfg.sensors, hwmon={'root': tmp.name}, nvml={'nvml': FakeNvml([61])})
+
+	def run():
+		reader.read_all()
+
+	def close():
+		reader.close()
+		tmp.cleanup()
+
+	run.close = close
+	return run
+
+@benchmark
+def strip_frame():
+	"""Rendering and writing one frame of a 300-LED addressable strip."""
+
+	import output
+	import render
+
+	table = lut.GradientLUT(lut.blackbody_rgb)
+	comms = FakeComms()
+	zone = FakeZone('strip', 0, 0, 300, comms)
+	scene = render.Scene(300, [render.Gradient(table), render.Meter('cpu', table, start=150), render.Pulse(source='cpu')])
+	writer = output.ZoneWriter(zone)
+	now = [0.0]
+
+	def run():
+		now[0] += 0.1
+		scene.render({'cpu': 0.6}, now[0])
+		writer.frame.fill(scene.buffer)
+		writer.write()
+
+	return run
+
+def measure(setup: Callable[[], Callable[[], object]], repeat: int) -> dict:
+	fn = setup()
+
+	try:
+		timer = timeit.Timer(fn)
+		number, _ = timer.autorange()
+		times = [t / number * 1e6 for t in timer.repeat(repeat, number)]
+	finally:
+		getattr(fn, 'close', lambda: None)()
+
+	return {
+		'number': number,
+		'best_us': min(times),
+		'median_us': statistics.median(times),
+	}
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+	parser.add_argument('names', nargs='*', help="benchmarks to run (default: all)")
+	parser.add_argument('-o', '--output', help="write results to this file instead of stdout")
+	parser.add_argument('-r', '--repeat', type=int, default=REPEAT, help=f"timing runs per benchmark (default: {REPEAT})")
+	parser.add_argument('-l', '--list', action='store_true', help="list benchmarks and exit")
+	args = parser.parse_args()
+
+	if args.list:
+		print('\n'.join(BENCHMARKS))
+		return
+
+	unknown = set(args.names) - set(BENCHMARKS)
+
+	if unknown:
+		parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+
+	results = {}
+
+	for name in args.names or BENCHMARKS:
+		try:
+			results[name] = measure(BENCHMARKS[name], args.repeat)
+		except ImportError as e:
+			results[name] = {'skipped': str(e)}
+
+		print(f"{name}: {results[name]}", file=sys.stderr)
+
+	report = json.dumps({
+		'python': platform.python_version(),
+		'machine': platform.machine(),
+		'results': results,
+	}, indent=2)
+
+	if args.output:
+		with open(args.output, 'w') as f:
+			f.write(report + '\n')
+	else:
+		print(report)
+
+if __name__ == '__main__':
+	main()
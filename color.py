@@ -1,6 +1,7 @@
 from collections import namedtuple
+from functools import lru_cache
 from math import exp
-from typing import Callable, Tuple
+from typing import Callable, Iterable, List, Optional, Tuple
 
 # Translated to Python by Jesse Weaver from (hosted at
 # https://www.fourmilab.ch/documents/specrend/specrend.c):
@@ -91,6 +92,74 @@ def xy_to_upvp(xc: float, yc: float) -> Tuple[float, float]:
 		(9 * yc) / ((-2 * xc) + (12 * yc) + 3),
 	)
 
+class PreparedColorSystem:
+	"""The xyz -> rgb matrix of a color system, derived once from its
+	primaries and white point so that conversions are just a
+	matrix-vector product.  Use prepare_color_system() to obtain
+	one, which shares instances between callers."""
+
+	__slots__ = ('cs', 'matrix')
+
+	def __init__(self, cs: ColorSystem):
+		xr = cs.x_red;    yr = cs.y_red;    zr = 1 - (xr + yr)
+		xg = cs.x_green;  yg = cs.y_green;  zg = 1 - (xg + yg)
+		xb = cs.x_blue;   yb = cs.y_blue;   zb = 1 - (xb + yb)
+
+		xw = cs.x_white;  yw = cs.y_white;  zw = 1 - (xw + yw)
+
+		# xyz -> rgb matrix, before scaling to white. 
+
+		rx = (yg * zb) - (yb * zg);  ry = (xb * zg) - (xg * zb);  rz = (xg * yb) - (xb * yg);
+		gx = (yb * zr) - (yr * zb);  gy = (xr * zb) - (xb * zr);  gz = (xb * yr) - (xr * yb);
+		bx = (yr * zg) - (yg * zr);  by = (xg * zr) - (xr * zg);  bz = (xr * yg) - (xg * yr);
+
+		# White scaling factors.
+		#   Dividing by yw scales the white luminance to unity, as conventional. 
+
+		rw = ((rx * xw) + (ry * yw) + (rz * zw)) / yw
+		gw = ((gx * xw) + (gy * yw) + (gz * zw)) / yw
+		bw = ((bx * xw) + (by * yw) + (bz * zw)) / yw
+
+		# xyz -> rgb matrix, correctly scaled to white. 
+
+		self.cs = cs
+		self.matrix = (
+			rx / rw, ry / rw, rz / rw,
+			gx / gw, gy / gw, gz / gw,
+			bx / bw, by / bw, bz / bw,
+		)
+
+	def apply(self, xc: float, yc: float, zc: float) -> Tuple[float, float, float]:
+		"""rgb of the chromaticity (XC, YC, ZC); see xyz_to_rgb()."""
+
+		rx, ry, rz, gx, gy, gz, bx, by, bz = self.matrix
+
+		return (
+			(rx * xc) + (ry * yc) + (rz * zc),
+			(gx * xc) + (gy * yc) + (gz * zc),
+			(bx * xc) + (by * yc) + (bz * zc),
+		)
+
+	def apply_many(self, xyzs: Iterable[Tuple[float, float, float]]) -> List[Tuple[float, float, float]]:
+		"""rgb of each (x, y, z) chromaticity in XYZS."""
+
+		rx, ry, rz, gx, gy, gz, bx, by, bz = self.matrix
+
+		return [
+			(
+				(rx * xc) + (ry * yc) + (rz * zc),
+				(gx * xc) + (gy * yc) + (gz * zc),
+				(bx * xc) + (by * yc) + (bz * zc),
+			)
+			for xc, yc, zc in xyzs
+		]
+
+@lru_cache(maxsize=None)
+def prepare_color_system(cs: ColorSystem) -> PreparedColorSystem:
+	"""Return the (shared) PreparedColorSystem for CS."""
+
+	return PreparedColorSystem(cs)
+
 def xyz_to_rgb(cs: ColorSystem, xc: float, yc: float, zc: float) -> Tuple[float, float, float]:
 	"""Given an additive tricolor system CS, defined by the CIE x
 	and y chromaticities of its three primaries (z is derived
@@ -106,38 +175,7 @@ def xyz_to_rgb(cs: ColorSystem, xc: float, yc: float, zc: float) -> Tuple[float,
 	the available gamut and/or norm_rgb to normalise the RGB
 	components so the largest nonzero component has value 1."""
 
-	xr = cs.x_red;    yr = cs.y_red;    zr = 1 - (xr + yr)
-	xg = cs.x_green;  yg = cs.y_green;  zg = 1 - (xg + yg)
-	xb = cs.x_blue;   yb = cs.y_blue;   zb = 1 - (xb + yb)
-
-	xw = cs.x_white;  yw = cs.y_white;  zw = 1 - (xw + yw)
-
-	# xyz -> rgb matrix, before scaling to white. 
-
-	rx = (yg * zb) - (yb * zg);  ry = (xb * zg) - (xg * zb);  rz = (xg * yb) - (xb * yg);
-	gx = (yb * zr) - (yr * zb);  gy = (xr * zb) - (xb * zr);  gz = (xb * yr) - (xr * yb);
-	bx = (yr * zg) - (yg * zr);  by = (xg * zr) - (xr * zg);  bz = (xr * yg) - (xg * yr);
-
-	# White scaling factors.
-	#   Dividing by yw scales the white luminance to unity, as conventional. 
-
-	rw = ((rx * xw) + (ry * yw) + (rz * zw)) / yw
-	gw = ((gx * xw) + (gy * yw) + (gz * zw)) / yw
-	bw = ((bx * xw) + (by * yw) + (bz * zw)) / yw
-
-	# xyz -> rgb matrix, correctly scaled to white. 
-
-	rx = rx / rw;  ry = ry / rw;  rz = rz / rw
-	gx = gx / gw;  gy = gy / gw;  gz = gz / gw
-	bx = bx / bw;  by = by / bw;  bz = bz / bw
-
-	# rgb of the desired point 
-
-	return (
-		(rx * xc) + (ry * yc) + (rz * zc),
-		(gx * xc) + (gy * yc) + (gz * zc),
-		(bx * xc) + (by * yc) + (bz * zc),
-	)
+	return prepare_color_system(cs).apply(xc, yc, zc)
 
 def inside_gamut(r: float, g: float, b: float) -> bool:
 	""" Test whether a requested color is within the gamut
@@ -191,9 +229,9 @@ def gamma_correct(cs: ColorSystem, c: float) -> float:
 		cc = 0.018
 
 		if c < cc:
-			c *= ((1.099 * c ** (cc, 0.45)) - 0.099) / cc
+			c *= ((1.099 * cc ** 0.45) - 0.099) / cc
 		else:
-			c = (1.099 * c ** (*c, 0.45)) - 0.099
+			c = (1.099 * c ** 0.45) - 0.099
 
 		return c
 	else:
@@ -289,17 +327,108 @@ def spectrum_to_xyz(spec_intens: Callable[[float], float]) -> Tuple[float, float
 		Z / XYZ,
 	)
 
+class PlanckKernel:
+	"""Planck's law sampled at a fixed set of WAVELENGTHS (in nm).  The
+	per-wavelength factors 3.74183e-16 * λ^-5 and 1.4388e-2 / λ (λ in
+	meters) are worked out once, leaving one exp() per wavelength for each
+	temperature.
+
+	Calling it gives the emittances at every wavelength for a temperature.
+	The last CACHE_SIZE results are kept; if QUANTUM is set, temperatures
+	are first rounded to a multiple of it (in kelvin), so that nearby
+	temperatures share an entry."""
+
+	def __init__(self, wavelengths: Iterable[float], cache_size: int = 256, quantum: Optional[float] = None):
+		self.wavelengths = tuple(wavelengths)
+		self.quantum = quantum
+		self._index = {λ: i for i, λ in enumerate(self.wavelengths)}
+
+		wlm = [λ * 1e-9 for λ in self.wavelengths]
+		self._c1 = tuple(3.74183e-16 * w**(-5.0) for w in wlm)
+		self._c2 = tuple(1.4388e-2 / w for w in wlm)
+		self._emittance = lru_cache(maxsize=cache_size)(self._evaluate)
+
+	def _evaluate(self, bb_temp: float) -> Tuple[float, ...]:
+		return tuple(c1 / (exp(c2 / bb_temp) - 1.0) for c1, c2 in zip(self._c1, self._c2))
+
+	def __call__(self, bb_temp: float) -> Tuple[float, ...]:
+		if self.quantum:
+			bb_temp = round(bb_temp / self.quantum) * self.quantum
+
+		return self._emittance(bb_temp)
+
+	def spectrum(self, bb_temp: float) -> Callable[[float], float]:
+		"""The spectrum of a black body at BB_TEMP as a function of
+		wavelength (in nm), for spectrum_to_xyz().  Wavelengths other than
+		the kernel's are evaluated directly."""
+
+		values = self(bb_temp)
+		index = self._index
+
+		def planck(wavelength: float) -> float:
+			i = index.get(wavelength)
+
+			if i is None:
+				wlm = wavelength * 1e-9
+				return (3.74183e-16 * wlm**(-5.0)) / (exp(1.4388e-2 / (wlm * bb_temp)) - 1.0)
+
+			return values[i]
+
+		return planck
+
+# Planck's law at the wavelengths of CIE_COLOR_MATCH.
+PLANCK = PlanckKernel(380 + i * 5 for i in range(len(CIE_COLOR_MATCH)))
+
 def bb_spectrum(bb_temp: float) -> Callable[[float], float]:
-	def planck(wavelength: float) -> float:
-		"""Calculate, by Planck's radiation law, the emittance of a black body
-		of temperature bb_temp at the given wavelength (in metres)."""
+	"""Calculate, by Planck's radiation law, the emittance of a black body
+	of temperature BB_TEMP as a function of wavelength (in nm)."""
 
-		wlm = wavelength * 1e-9 # Wavelength in meters 
+	return PLANCK.spectrum(bb_temp)
 
-		return ((3.74183e-16 * wlm**(-5.0)) /
-			   (exp(1.4388e-2 / (wlm * bb_temp)) - 1.0))
-	
-	return planck
+# Planckian locus.
+#
+# The chromaticity of a black body follows a smooth curve in x, y, which Kim
+# et al. ("Design of Advanced Color Temperature Control System for HDTV
+# Applications", Journal of the Korean Physical Society 41, 2002) fit with
+# cubic splines: x as a cubic in 1/T, then y as a cubic in x, piecewise over
+# 1667 K to 25000 K. Their fit strays badly below 1667 K, so the coolest
+# segment below was fitted the same way to spectrum_to_xyz(bb_spectrum(T))
+# between 1000 K and 1667 K.
+#
+# Each row holds the lower bound of a segment and its coefficients, highest
+# power first.
+
+_LOCUS_X = (
+	(4000, (-3.0258469e9,  2.1070379e6, 0.2226347e3, 0.240390)),
+	(1667, (-0.2661239e9, -0.2343589e6, 0.8776956e3, 0.179910)),
+	(0,    ( 0.2516791e9, -0.8373449e6, 1.0659547e3, 0.172647)),
+)
+
+_LOCUS_Y = (
+	(4000, ( 3.0817580, -5.87338670, 3.75112997, -0.37001483)),
+	(2222, (-0.9549476, -1.37418593, 2.09137015, -0.16748867)),
+	(1667, (-1.1063814, -1.34811020, 2.18555832, -0.20219683)),
+	(0,    ( 5.4425510, -12.8064447, 8.86681700, -1.50049834)),
+)
+
+def planckian_xy(bb_temp: float) -> Tuple[float, float]:
+	"""The chromaticity x, y of a black body at BB_TEMP kelvin, from the
+	cubic spline fit of the Planckian locus above; within about 6e-4 of
+	spectrum_to_xyz(bb_spectrum(bb_temp)) from 1000 K to 9000 K."""
+
+	u = 1 / bb_temp
+
+	for lo, (a, b, c, d) in _LOCUS_X:
+		if bb_temp >= lo:
+			break
+
+	x = ((a * u + b) * u + c) * u + d
+
+	for lo, (a, b, c, d) in _LOCUS_Y:
+		if bb_temp >= lo:
+			break
+
+	return x, ((a * x + b) * x + c) * x + d
 
 # Built-in test program which displays the x, y, and Z and RGB
 #   values for black body spectra from 1000 to 10000 degrees kelvin.
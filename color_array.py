@@ -0,0 +1,273 @@
+import numpy as np
+from typing import Optional, Tuple
+
+import color
+
+# NumPy counterparts of the spectral routines and color conversions in
+# color.py, for generating many colors at once (gradient tables, calibration
+# sweeps). The scalar functions in color.py stay free of NumPy so the daemon
+# does not need it.
+
+# Wavelengths (in nanometers) at which CIE_COLOR_MATCH is sampled.
+WAVELENGTHS = np.arange(380, 781, 5, dtype=np.float64)
+
+# CIE_COLOR_MATCH as an (81, 3) array of xBar, yBar, zBar.
+CIE_COLOR_MATCH = np.array(color.CIE_COLOR_MATCH, dtype=np.float64)
+
+# Per-wavelength factors of Planck's law: 3.74183e-16 * λ^-5 and 1.4388e-2 / λ
+#   with λ in meters.
+_WLM = WAVELENGTHS * 1e-9
+_PLANCK_C1 = 3.74183e-16 * _WLM ** -5.0
+_PLANCK_C2 = 1.4388e-2 / _WLM
+
+def bb_spectra(bb_temps: np.ndarray) -> np.ndarray:
+	"""Emittance of black bodies at each of the temperatures in BB_TEMPS
+	(an array of shape (N,)), sampled at WAVELENGTHS.  Returns an
+	(N, 81) array."""
+
+	bb_temps = np.asarray(bb_temps, dtype=np.float64).reshape(-1, 1)
+
+	return _PLANCK_C1 / (np.exp(_PLANCK_C2 / bb_temps) - 1.0)
+
+def spectra_to_xyz(spectra: np.ndarray) -> np.ndarray:
+	"""Chromaticity coordinates of each row of SPECTRA, an (N, 81) array of
+	emittances sampled at WAVELENGTHS.  Returns an (N, 3) array whose
+	rows sum to 1, as spectrum_to_xyz() does for a single spectrum."""
+
+	XYZ = np.asarray(spectra, dtype=np.float64) @ CIE_COLOR_MATCH
+
+	return XYZ / XYZ.sum(axis=1, keepdims=True)
+
+def bb_to_xyz(bb_temps: np.ndarray) -> np.ndarray:
+	"""Chromaticity coordinates of black bodies at each of the temperatures in
+	BB_TEMPS; an (N, 3) array."""
+
+	return spectra_to_xyz(bb_spectra(bb_temps))
+
+def bb_temp_to_xyz(bb_temp: float) -> Tuple[float, float, float]:
+	"""Scalar form of bb_to_xyz(); equivalent to
+	color.spectrum_to_xyz(color.bb_spectrum(bb_temp))."""
+
+	x, y, z = bb_to_xyz(np.array((bb_temp,)))[0]
+
+	return float(x), float(y), float(z)
+
+class SPD:
+	"""A spectral power distribution sampled at WAVELENGTHS: VALUES is a
+	contiguous array of 81 emittances, in arbitrary units.  Calling it
+	interpolates the emittance at any wavelength (in nm), so an SPD can also
+	be passed wherever a spectrum function is expected, as with
+	color.spectrum_to_xyz()."""
+
+	__slots__ = ('values',)
+
+	def __init__(self, values: np.ndarray):
+		values = np.ascontiguousarray(values, dtype=np.float64)
+
+		if values.shape != WAVELENGTHS.shape:
+			raise ValueError(f"an SPD needs {len(WAVELENGTHS)} values, got shape {values.shape}")
+
+		self.values = values
+
+	@classmethod
+	def resample(cls, wavelengths: np.ndarray, values: np.ndarray) -> 'SPD':
+		"""The SPD of tabulated data: VALUES measured at WAVELENGTHS (in nm,
+		ascending, at any spacing), interpolated linearly onto the 5 nm grid
+		and taken as zero outside the measured range."""
+
+		wavelengths = np.asarray(wavelengths, dtype=np.float64)
+		values = np.asarray(values, dtype=np.float64)
+
+		if wavelengths.shape != values.shape or wavelengths.ndim != 1:
+			raise ValueError("resampling needs one value per wavelength")
+
+		if np.any(np.diff(wavelengths) <= 0):
+			raise ValueError("wavelengths must be strictly ascending")
+
+		return cls(np.interp(WAVELENGTHS, wavelengths, values, left=0.0, right=0.0))
+
+	@classmethod
+	def blackbody(cls, bb_temp: float) -> 'SPD':
+		"""The spectrum of a black body at BB_TEMP kelvin."""
+
+		return cls(bb_spectra(np.array((bb_temp,)))[0])
+
+	def __call__(self, wavelength: float) -> float:
+		return float(np.interp(wavelength, WAVELENGTHS, self.values))
+
+	def to_xyz(self) -> Tuple[float, float, float]:
+		"""Chromaticity coordinates of the SPD; see color.spectrum_to_xyz()."""
+
+		x, y, z = spectra_to_xyz(self.values.reshape(1, -1))[0]
+
+		return float(x), float(y), float(z)
+
+def spds_to_xyz(spds) -> np.ndarray:
+	"""Chromaticity coordinates of each of SPDS, a sequence of SPD or an
+	(N, 81) array of their values, in one matrix product; an (N, 3)
+	array."""
+
+	if not isinstance(spds, np.ndarray):
+		spds = np.stack([s.values for s in spds]) if len(spds) else np.empty((0, len(WAVELENGTHS)))
+
+	return spectra_to_xyz(spds)
+
+def _locus_segments(segments, bb_temps: np.ndarray, v: np.ndarray, out: np.ndarray):
+	# Coolest segment first, each hotter one overwriting where it applies.
+	for lo, (a, b, c, d) in reversed(segments):
+		sel = bb_temps >= lo
+		vs = v[sel]
+		out[sel] = ((a * vs + b) * vs + c) * vs + d
+
+def planckian_xy(bb_temps: np.ndarray) -> np.ndarray:
+	"""Chromaticity x, y of black bodies at each of the temperatures in
+	BB_TEMPS from the Planckian locus fit of color.planckian_xy(); an (N, 2)
+	array."""
+
+	bb_temps = np.asarray(bb_temps, dtype=np.float64).reshape(-1)
+	out = np.empty((len(bb_temps), 2))
+
+	_locus_segments(color._LOCUS_X, bb_temps, 1 / bb_temps, out[:, 0])
+	_locus_segments(color._LOCUS_Y, bb_temps, out[:, 0], out[:, 1])
+
+	return out
+
+# Array forms of the conversions in color.py.  Each takes an (N, 2) or (N, 3)
+#   array with one color per row and writes its result to OUT if given, so
+#   that a pipeline such as
+#
+#     rgb = xyz_to_rgb(cs, bb_to_xyz(temps))
+#     norm_rgb(constrain_rgb(rgb, out=rgb), out=rgb)
+#
+#   reuses one buffer throughout.
+
+def _out(out: Optional[np.ndarray], shape: Tuple[int, ...]) -> np.ndarray:
+	return np.empty(shape) if out is None else out
+
+def upvp_to_xy(upvp: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+	"""1931 chromaticities x, y of the 1976 coordinates u', v' in each row of
+	UPVP; see color.upvp_to_xy().  OUT may be UPVP itself."""
+
+	upvp = np.asarray(upvp, dtype=np.float64)
+	up, vp = upvp[:, 0], upvp[:, 1]
+	d = 6 * up - 16 * vp + 12
+	out = _out(out, upvp.shape)
+
+	np.multiply(up, 9, out=out[:, 0])
+	np.multiply(vp, 4, out=out[:, 1])
+	out /= d[:, np.newaxis]
+
+	return out
+
+def xy_to_upvp(xy: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+	"""1976 coordinates u', v' of the 1931 chromaticities x, y in each row of
+	XY; see color.xy_to_upvp().  OUT may be XY itself."""
+
+	xy = np.asarray(xy, dtype=np.float64)
+	x, y = xy[:, 0], xy[:, 1]
+	d = -2 * x + 12 * y + 3
+	out = _out(out, xy.shape)
+
+	np.multiply(x, 4, out=out[:, 0])
+	np.multiply(y, 9, out=out[:, 1])
+	out /= d[:, np.newaxis]
+
+	return out
+
+def xyz_to_rgb(cs: color.ColorSystem, xyz: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+	"""Linear r, g, b in the color system CS of the chromaticity in each row
+	of XYZ; see color.xyz_to_rgb().  OUT may be XYZ itself."""
+
+	xyz = np.asarray(xyz, dtype=np.float64)
+	matrix = np.array(color.prepare_color_system(cs).matrix).reshape(3, 3)
+
+	if out is None:
+		return xyz @ matrix.T
+
+	if np.may_share_memory(xyz, out):
+		out[...] = xyz @ matrix.T
+	else:
+		np.matmul(xyz, matrix.T, out=out)
+
+	return out
+
+def inside_gamut(rgb: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+	"""Whether each row of RGB is within the gamut, i.e. has no negative
+	component; an (N,) array of booleans."""
+
+	return np.all(np.asarray(rgb) >= 0, axis=1, out=out)
+
+def constrain_rgb(rgb: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+	"""Desaturate each row of RGB that lies outside the gamut by adding just
+	enough white to make all of its components non-negative; see
+	color.constrain_rgb().  OUT may be RGB itself."""
+
+	rgb = np.asarray(rgb, dtype=np.float64)
+	w = rgb.min(axis=1, keepdims=True)
+	np.minimum(w, 0, out=w)
+
+	return np.subtract(rgb, w, out=out)
+
+def norm_rgb(rgb: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+	"""Scale each row of RGB so that its greatest component (unless none is
+	positive) is 1; see color.norm_rgb().  OUT may be RGB itself."""
+
+	rgb = np.asarray(rgb, dtype=np.float64)
+	greatest = rgb.max(axis=1, keepdims=True)
+	greatest[greatest <= 0] = 1
+
+	return np.divide(rgb, greatest, out=out)
+
+def gamma_correct(cs: color.ColorSystem, rgb: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+	"""Apply the transfer function of CS (see color.gamma_correct()) to every
+	element of RGB, an array of linear values of any shape.  The result is
+	written to OUT if given, which may be RGB itself."""
+
+	rgb = np.asarray(rgb, dtype=np.float64)
+
+	if out is None:
+		out = np.empty_like(rgb)
+
+	with np.errstate(invalid='ignore'):
+		if cs.gamma is color.GAMMA_REC709:
+			# Rec. 709: linear below the cutoff, a power law above it.
+			cc = 0.018
+			low = rgb < cc
+			low_rgb = rgb[low] * (((1.099 * cc ** 0.45) - 0.099) / cc)
+
+			np.power(rgb, 0.45, out=out)
+			out *= 1.099
+			out -= 0.099
+			out[low] = low_rgb
+		else:
+			np.power(rgb, 1.0 / cs.gamma, out=out)
+
+	return out
+
+class GammaLUT:
+	"""The transfer function of CS sampled at SIZE evenly spaced linear values
+	between 0 and 1, as BITS-bit integers (8 or 16).  SIZE defaults to 4096
+	samples for 8-bit output and 65536 for 16-bit.
+
+	Calling it maps an array of linear values straight to output codes by
+	table lookup, rounding inputs to the nearest sample and clamping them to
+	[0, 1]."""
+
+	def __init__(self, cs: color.ColorSystem, bits: int = 8, size: Optional[int] = None):
+		if bits not in (8, 16):
+			raise ValueError("GammaLUT supports 8- and 16-bit output")
+
+		if size is None:
+			size = 4096 if bits == 8 else 65536
+
+		self.cs = cs
+		self.bits = bits
+		self.dtype = np.uint8 if bits == 8 else np.uint16
+		self.size = size
+		self.table = np.rint(gamma_correct(cs, np.linspace(0, 1, size)) * ((1 << bits) - 1)).astype(self.dtype)
+
+	def __call__(self, rgb: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+		idx = np.asarray(rgb, dtype=np.float64) * (self.size - 1) + 0.5
+		np.clip(idx, 0, self.size - 1, out=idx)
+
+		return np.take(self.table, idx.astype(np.intp), out=out)
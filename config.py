@@ -0,0 +1,367 @@
+from collections import namedtuple
+import json
+from typing import Any, Dict, List, Optional
+
+import quadrature
+
+# Daemon configuration.
+#
+# The configuration is a JSON file (named by TEMPERATURE_CONFIG) with two
+# sections: "sensors" names the readings to track, and "zones" says which
+# sensor drives each LED of which device zone. For example, the built-in
+# default is equivalent to:
+#
+#   {
+#     "sensors": {
+#       "cpu": {"chip": "zenpower", "label": "Tdie", "min": 30, "max": 100,
+#               "filters": [{"type": "median", "size": 3},
+#                           {"type": "hysteresis", "band": 0.5}]},
+#       "gpu": {"chip": "amdgpu", "label": "edge", "min": 30, "max": 100,
+#               "filters": [{"type": "median", "size": 3},
+#                           {"type": "hysteresis", "band": 0.5}]}
+#     },
+#     "zones": [
+#       {"device_type": "MOTHERBOARD", "zone": 1,
+#        "leds": ["cpu", "cpu", null, "gpu", "gpu", null]}
+#     ]
+#   }
+#
+# A sensor's "type" (default "hwmon") says where its readings come from, and
+# which other settings it takes:
+#
+#   "hwmon": temperature "label" of hwmon chip "chip", in °C;
+#   "psutil": the same, as reported by psutil.sensors_temperatures();
+#   "nvml": core temperature of NVIDIA GPU "index" (default 0), in °C;
+#   "cpu_load": busy time of "cpu" ("cpu" for all, or e.g. "cpu3"), in %;
+#   "memory": memory in use, in %;
+#   "disk": throughput of block "device" (e.g. "nvme0n1"), in MB/s, for
+#     "direction" "read", "write" or "both" (the default);
+#   "net": throughput of network "interface", in MB/s, for "direction"
+#     "rx", "tx" or "both" (the default).
+#
+# "min" (default 30) and "max" (default 100) are the readings shown as the
+# coolest and the hottest color.
+#
+# A sensor's "filters" (default none) smooth its readings before they are
+# rendered, applied in order (see filters.py):
+#
+#   {"type": "median", "size": 3}
+#   {"type": "ema", "alpha": 0.5}
+#   {"type": "hysteresis", "band": 0.5}
+#
+# A zone entry matches every device with the given "device_type" (a
+# DeviceType name) and/or "device_name"; leaving both out matches every
+# device. "zone" is a zone index or name, or omitted for all zones of the
+# device. "mode" is the device mode to select before writing, by index or name
+# (default 0, normally Direct).
+#
+# What the zone shows is given by exactly one of:
+#
+#   "leds": a sensor (or null for off) per LED, each LED showing the color of
+#     its sensor's reading;
+#   "source": one sensor whose color the whole zone shows;
+#   "layers": a list of layers (see render.py), drawn in order. Every layer
+#     has a "type" and may limit itself to "count" LEDs from "start":
+#       {"type": "solid", "color": [r, g, b]}
+#       {"type": "color", "source": sensor}
+#       {"type": "gradient", "lo": 0, "hi": 1}
+#       {"type": "meter", "source": sensor, "background": [r, g, b]}
+#       {"type": "pulse", "period": seconds, "depth": 0.5, "source": sensor}
+#     Colors are 0-255 components. Sensor-driven colors, gradients and meters
+#     use the blackbody scale.
+#
+# "fps" (default 10) is how often frames are rendered while anything on the
+# LEDs is moving. Temperatures are interpolated between samples, so raising it
+# smooths transitions. Once everything has settled, nothing is rendered until
+# the next sample changes something.
+#
+# "sampling" sets how often the sensors are read: every "max_interval"
+# seconds (default 1) while readings are steady, dropping to every
+# "min_interval" seconds (default 0.1) as soon as any filtered reading moves
+# faster than "fast_rate" per second, and backing off again as they settle.
+# The rate is a fraction of each sensor's max - min, so that readings in
+# different units compare fairly: the default of 0.015 is about 1 °C per
+# second over 30-100 °C, or 1.5 % per second of CPU load over 0-100 %. A
+# sensor can set its own "fast_rate", on the same scale, to be watched more
+# or less closely; noisy readings such as CPU load are best also given a
+# hysteresis filter, so that jitter alone does not keep sampling fast.
+#
+# "gamma_correct" (default false) applies the Rec. 709 transfer function to
+# the colors sent to the devices.
+#
+# "quadrature" (default "table") is how spectra are integrated when the
+# blackbody gradient is built: "table", "reduced:N" or "analytic:N" (see
+# quadrature.py), or "planckian" to skip integration for a closed-form fit of
+# the blackbody colors (see color.planckian_xy()). Only matters for how long a
+# first start takes.
+#
+# "connections" (default 4) caps how many SDK connections device writes are
+# spread over; each connection writes its devices in parallel with the others.
+#
+# "threshold" (default 3) is how far (see output.color_distance(), from 0 to
+# about 765) some LED of a zone must have moved from the colors last sent
+# before the zone is written again; 0 writes every change. "refresh" (default
+# 30) is how many seconds may pass before an unchanged zone is written again
+# anyway, in case something else changed the device; null never does.
+
+# A reading from the source for TYPE (see sensors.py), with the settings
+#   PARAMS, shown as the coolest color at MIN and the hottest at MAX after
+#   passing through FILTERS. FAST_RATE, if not None, overrides the sampling
+#   fast_rate for this sensor.
+SensorConfig = namedtuple('SensorConfig', ('type', 'params', 'min', 'max', 'filters', 'fast_rate'), defaults=((), None))
+
+SENSOR_TYPES = {
+	# Sensor type: (required keys, optional keys)
+	'hwmon': (('chip', 'label'), ()),
+	'psutil': (('chip', 'label'), ()),
+	'nvml': ((), ('index',)),
+	'cpu_load': ((), ('cpu',)),
+	'memory': ((), ()),
+	'disk': (('device',), ('direction',)),
+	'net': (('interface',), ('direction',)),
+}
+
+ZoneConfig = namedtuple('ZoneConfig', (
+	'device_type',  # DeviceType name, or None for any
+	'device_name',  # Exact device name, or None for any
+	'zone',         # Zone index or name, or None for all zones
+	'layers',       # Layer configurations, with "leds" and "source" translated
+	'mode',         # Mode index or name to select
+))
+
+SamplingConfig = namedtuple('SamplingConfig', ('min_interval', 'max_interval', 'fast_rate'))
+
+Config = namedtuple('Config', ('sensors', 'zones', 'connections', 'gamma_correct', 'fps', 'sampling', 'quadrature', 'threshold', 'refresh'))
+
+LAYER_TYPES = {
+	# Layer type: (required keys, optional keys)
+	'solid': (('color',), ()),
+	'color': (('source',), ()),
+	'gradient': ((), ('lo', 'hi')),
+	'meter': (('source',), ('background',)),
+	'pulse': ((), ('period', 'depth', 'source')),
+}
+
+FILTER_TYPES = {
+	# Filter type: optional keys
+	'median': ('size',),
+	'ema': ('alpha',),
+	'hysteresis': ('band',),
+}
+
+# Drops single-sample spikes, then sub-degree wobble.
+DEFAULT_FILTERS = [{'type': 'median', 'size': 3}, {'type': 'hysteresis', 'band': 0.5}]
+
+DEFAULT_CONFIG = {
+	'sensors': {
+		'cpu': {'chip': 'zenpower', 'label': 'Tdie', 'min': 30, 'max': 100, 'filters': DEFAULT_FILTERS},
+		'gpu': {'chip': 'amdgpu', 'label': 'edge', 'min': 30, 'max': 100, 'filters': DEFAULT_FILTERS},
+	},
+	'zones': [
+		{'device_type': 'MOTHERBOARD', 'zone': 1, 'leds': ['cpu', 'cpu', None, 'gpu', 'gpu', None]},
+	],
+}
+
+def _leds_to_layers(sources: List[Optional[str]]) -> List[Dict[str, Any]]:
+	# One color layer per run of LEDs showing the same sensor.
+	layers: List[Dict[str, Any]] = []
+	i = 0
+
+	while i < len(sources):
+		j = i
+
+		while j < len(sources) and sources[j] == sources[i]:
+			j += 1
+
+		if sources[i] is not None:
+			layers.append({'type': 'color', 'source': sources[i], 'start': i, 'count': j - i})
+
+		i = j
+
+	return layers
+
+def _is_number(v: Any) -> bool:
+	return isinstance(v, (int, float)) and not isinstance(v, bool)
+
+def _is_color(v: Any) -> bool:
+	return isinstance(v, (list, tuple)) and len(v) == 3 and all(_is_number(c) and 0 <= c <= 255 for c in v)
+
+def _check_layer(where: str, layer: Dict[str, Any], sensors: Dict[str, SensorConfig]):
+	kind = layer.get('type')
+
+	if kind not in LAYER_TYPES:
+		raise ValueError(f"{where} has unknown type {kind!r}")
+
+	required, optional = LAYER_TYPES[kind]
+	unknown = set(layer) - {'type', 'start', 'count'} - set(required) - set(optional)
+
+	if unknown:
+		raise ValueError(f"{where} has unknown settings {', '.join(sorted(unknown))}")
+
+	for key in required:
+		if key not in layer:
+			raise ValueError(f"{where} needs a {key}")
+
+	if 'source' in layer and layer['source'] not in sensors:
+		raise ValueError(f"{where} refers to unknown sensor {layer['source']!r}")
+
+	for key in ('color', 'background'):
+		if key in layer and not _is_color(layer[key]):
+			raise ValueError(f"{where} needs a {key} of three components from 0 to 255")
+
+	for key in ('start', 'count'):
+		if layer.get(key) is not None and not (isinstance(layer[key], int) and layer[key] >= 0):
+			raise ValueError(f"{where} needs a non-negative integer {key}")
+
+	if not _is_number(layer.get('period', 1)) or layer.get('period', 1) <= 0:
+		raise ValueError(f"{where} needs a positive period")
+
+	if not _is_number(layer.get('depth', 0)) or not 0 <= layer.get('depth', 0) <= 1:
+		raise ValueError(f"{where} needs a depth between 0 and 1")
+
+	for key in ('lo', 'hi'):
+		if not _is_number(layer.get(key, 0)):
+			raise ValueError(f"{where} needs a number for {key}")
+
+def _check_filter(where: str, f: Dict[str, Any]):
+	kind = f.get('type')
+
+	if kind not in FILTER_TYPES:
+		raise ValueError(f"{where} has unknown type {kind!r}")
+
+	unknown = set(f) - {'type'} - set(FILTER_TYPES[kind])
+
+	if unknown:
+		raise ValueError(f"{where} has unknown settings {', '.join(sorted(unknown))}")
+
+	size = f.get('size', 3)
+	alpha = f.get('alpha', 0.5)
+	band = f.get('band', 0.5)
+
+	if not (isinstance(size, int) and not isinstance(size, bool) and size >= 1):
+		raise ValueError(f"{where} needs a positive integer size")
+
+	if not (_is_number(alpha) and 0 < alpha <= 1):
+		raise ValueError(f"{where} needs an alpha between 0 and 1")
+
+	if not (_is_number(band) and band >= 0):
+		raise ValueError(f"{where} needs a non-negative band")
+
+def _is_index_or_name(v: Any) -> bool:
+	return isinstance(v, str) or (isinstance(v, int) and not isinstance(v, bool) and v >= 0)
+
+def _check_zone(where: str, z: Dict[str, Any]):
+	kind = z.get('device_type')
+
+	if kind is not None:
+		# Only imported when needed: the client comes with it.
+		from openrgb.utils import DeviceType
+
+		if kind not in DeviceType.__members__:
+			raise ValueError(f"{where} has unknown device_type {kind!r}, expected one of {', '.join(DeviceType.__members__)}")
+
+	if z.get('device_name') is not None and not isinstance(z['device_name'], str):
+		raise ValueError(f"{where} needs a string device_name")
+
+	if z.get('zone') is not None and not _is_index_or_name(z['zone']):
+		raise ValueError(f"{where} needs a zone index or name")
+
+	if not _is_index_or_name(z.get('mode', 0)):
+		raise ValueError(f"{where} needs a mode index or name")
+
+def parse(raw: Dict[str, Any]) -> Config:
+	"""Validate the decoded JSON configuration RAW. Raises ValueError
+	describing the first problem found."""
+
+	sensors = {}
+
+	for name, s in raw.get('sensors', {}).items():
+		kind = s.get('type', 'hwmon')
+
+		if kind not in SENSOR_TYPES:
+			raise ValueError(f"sensor {name!r} has unknown type {kind!r}")
+
+		required, optional = SENSOR_TYPES[kind]
+		unknown = set(s) - {'type', 'min', 'max', 'filters', 'fast_rate'} - set(required) - set(optional)
+
+		if unknown:
+			raise ValueError(f"sensor {name!r} has unknown settings {', '.join(sorted(unknown))}")
+
+		for key in required:
+			if key not in s:
+				raise ValueError(f"sensor {name!r} needs a {key}")
+
+		params = {k: s[k] for k in required + optional if k in s}
+		sensors[name] = SensorConfig(kind, params, float(s.get('min', 30)), float(s.get('max', 100)), list(s.get('filters', ())), s.get('fast_rate'))
+
+		if sensors[name].max <= sensors[name].min:
+			raise ValueError(f"sensor {name!r} has max <= min")
+
+		if 'fast_rate' in s and not (_is_number(s['fast_rate']) and s['fast_rate'] > 0):
+			raise ValueError(f"sensor {name!r} needs a positive fast_rate")
+
+		for j, f in enumerate(sensors[name].filters):
+			_check_filter(f"filter {j} of sensor {name!r}", f)
+
+	zones = []
+
+	for i, z in enumerate(raw.get('zones', [])):
+		given = [k for k in ('leds', 'source', 'layers') if z.get(k) is not None]
+
+		if len(given) != 1:
+			raise ValueError(f"zone entry {i} needs exactly one of leds, source and layers")
+
+		if 'leds' in given:
+			layers = _leds_to_layers(z['leds'])
+		elif 'source' in given:
+			layers = [{'type': 'color', 'source': z['source']}]
+		else:
+			layers = z['layers']
+
+		for j, layer in enumerate(layers):
+			_check_layer(f"layer {j} of zone entry {i}", layer, sensors)
+
+		_check_zone(f"zone entry {i}", z)
+		zones.append(ZoneConfig(z.get('device_type'), z.get('device_name'), z.get('zone'), layers, z.get('mode', 0)))
+
+	fps = float(raw.get('fps', 10))
+
+	if fps <= 0:
+		raise ValueError("fps must be positive")
+
+	s = raw.get('sampling', {})
+	sampling = SamplingConfig(float(s.get('min_interval', 0.1)), float(s.get('max_interval', 1.0)), float(s.get('fast_rate', 0.015)))
+
+	if not 0 < sampling.min_interval <= sampling.max_interval:
+		raise ValueError("sampling needs 0 < min_interval <= max_interval")
+
+	if sampling.fast_rate <= 0:
+		raise ValueError("sampling needs a positive fast_rate")
+
+	quad = str(raw.get('quadrature', 'table'))
+
+	if quad != 'planckian':
+		# Raises ValueError for names it does not know.
+		quadrature.get(quad)
+
+	threshold = raw.get('threshold', 3)
+
+	if not (_is_number(threshold) and threshold >= 0):
+		raise ValueError("threshold must be a non-negative number")
+
+	refresh = raw.get('refresh', 30)
+
+	if refresh is not None and not (_is_number(refresh) and refresh > 0):
+		raise ValueError("refresh must be a positive number of seconds, or null")
+
+	return Config(sensors, zones, int(raw.get('connections', 4)), bool(raw.get('gamma_correct', False)), fps, sampling, quad, float(threshold), None if refresh is None else float(refresh))
+
+def load(path: Optional[str] = None) -> Config:
+	"""Load the configuration from PATH, or the default configuration if PATH
+	is None."""
+
+	if path is None:
+		return parse(DEFAULT_CONFIG)
+
+	with open(path) as f:
+		return parse(json.load(f))
@@ -0,0 +1,166 @@
+import random
+import threading
+from time import sleep
+from typing import Callable, List, Optional
+
+from openrgb import OpenRGBClient
+
+import config
+import devices
+
+# Keeping the SDK connections up.
+#
+# Connecting an OpenRGBClient downloads the data of every controller and the
+# profile and plugin lists, which takes a while with many devices. When a
+# write fails, Connections instead reopens the sockets of the clients it
+# already has: their device and zone objects stay valid, and a controller
+# count request is enough to tell whether the server's device list changed
+# (in which case the client re-downloads it by itself). A spare client is
+# kept connected on the side, to stand in for one whose connection broke
+# while the server stayed up.
+#
+# While the server is unreachable, retries back off exponentially with
+# jitter, starting fast enough that a restarted server is picked up within a
+# fraction of a second.
+
+class Backoff:
+	"""Delays between retries, doubling from BASE up to CAP seconds. Each
+	delay is drawn between half and all of its nominal value, so that several
+	clients retrying at once spread out."""
+
+	def __init__(self, base: float = 0.1, cap: float = 5.0, rand: Callable[[], float] = random.random):
+		self.base = base
+		self.cap = cap
+		self.rand = rand
+		self.attempts = 0
+
+	def next(self) -> float:
+		nominal = min(self.base * 2 ** self.attempts, self.cap)
+		self.attempts += 1
+
+		return nominal * (0.5 + 0.5 * self.rand())
+
+	def reset(self):
+		self.attempts = 0
+
+def _probe(client: OpenRGBClient):
+	# A round trip on the connection; also re-downloads the device list if
+	#   the number of devices changed.
+	client.comms.requestDeviceNum()
+
+def _revive(client: OpenRGBClient):
+	try:
+		_probe(client)
+	except OSError:
+		client.disconnect()
+		client.connect()
+		_probe(client)
+
+class Connections:
+	"""Owns the SDK connections of a Fanout for CFG (see devices.Fanout for
+	LUT; KWARGS are passed to OpenRGBClient), reopening them with backoff
+	whenever they fail."""
+
+	def __init__(self, cfg: config.Config, lut, standby: bool = True, backoff: Optional[Backoff] = None, **kwargs):
+		self.cfg = cfg
+		self.lut = lut
+		self.kwargs = kwargs
+		self.backoff = backoff or Backoff()
+		self.fanout: Optional[devices.Fanout] = None
+
+		self._want_standby = standby
+		self._standby: Optional[OpenRGBClient] = None
+		self._standby_lock = threading.Lock()
+
+	def _retry(self, attempt: Callable[[], devices.Fanout], on_error: Callable[[OSError], None] = lambda e: None) -> devices.Fanout:
+		while True:
+			try:
+				fanout = attempt()
+			except OSError as e:
+				on_error(e)
+				sleep(self.backoff.next())
+				continue
+
+			self.backoff.reset()
+
+			return fanout
+
+	def open(self, on_error: Callable[[OSError], None] = lambda e: None) -> devices.Fanout:
+		"""Connect, retrying until the server answers. ON_ERROR is called
+		with each failure."""
+
+		self.fanout = self._retry(lambda: devices.Fanout.connect(self.cfg, self.lut, **self.kwargs), on_error)
+		self._refill_standby()
+
+		return self.fanout
+
+	def _take_standby(self) -> Optional[OpenRGBClient]:
+		with self._standby_lock:
+			client, self._standby = self._standby, None
+
+		return client
+
+	def _refill_standby(self):
+		if not self._want_standby:
+			return
+
+		def connect():
+			try:
+				client = OpenRGBClient(**self.kwargs)
+			except OSError:
+				return
+
+			with self._standby_lock:
+				if self._standby is None:
+					self._standby = client
+					return
+
+			client.disconnect()
+
+		threading.Thread(target=connect, name='standby', daemon=True).start()
+
+	def _reopen(self, clients: List[OpenRGBClient]) -> devices.Fanout:
+		revived = []
+
+		for client in clients:
+			if not client.comms.connected:
+				spare = self._take_standby()
+
+				if spare is not None:
+					try:
+						_probe(spare)
+					except OSError:
+						spare.disconnect()
+					else:
+						client.disconnect()
+						client = spare
+
+			_revive(client)
+			revived.append(client)
+
+		clients[:] = revived
+
+		return devices.Fanout(revived, self.cfg, self.lut)
+
+	def recover(self, on_error: Callable[[OSError], None] = lambda e: None) -> devices.Fanout:
+		"""Bring the connections back after a failed write, reusing the clients
+		(and what they know about the devices) where possible. Retries until
+		the server answers; ON_ERROR is called with each failure."""
+
+		assert self.fanout is not None
+		clients = list(self.fanout.clients)
+		self.fanout.close(disconnect=False)
+
+		self.fanout = self._retry(lambda: self._reopen(clients), on_error)
+		self._refill_standby()
+
+		return self.fanout
+
+	def close(self):
+		if self.fanout is not None:
+			self.fanout.close()
+
+		spare = self._take_standby()
+
+		if spare is not None:
+			spare.disconnect()
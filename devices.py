@@ -0,0 +1,152 @@
+from concurrent.futures import ThreadPoolExecutor, wait
+from openrgb import OpenRGBClient
+from openrgb.utils import DeviceType
+from typing import List, Optional
+
+import config
+import output
+import render
+
+# Fanning frames out to every configured device zone.
+#
+# The client serializes everything sent over one connection, so writing to
+# several devices through a single OpenRGBClient costs the sum of their round
+# trips. Fanout instead opens a few connections, gives each its share of the
+# devices and writes over all of them at once.
+
+class ZoneTarget:
+	"""A device zone, the Scene drawn on it and the ZoneWriter used to update
+	it (see there for THRESHOLD and REFRESH)."""
+
+	def __init__(self, device, zone, scene: render.Scene, threshold: float = 0, refresh: Optional[float] = 30.0):
+		self.device = device
+		self.zone = zone
+		self.scene = scene
+		self.writer = output.ZoneWriter(zone, threshold, refresh)
+
+	def frame(self) -> output.FrameBuffer:
+		"""The zone's colors, as last rendered by the scene."""
+
+		frame = self.writer.frame
+		frame.fill(self.scene.buffer)
+
+		return frame
+
+def _matches(zc: config.ZoneConfig, device) -> bool:
+	if zc.device_type is not None and device.type != DeviceType[zc.device_type]:
+		return False
+
+	if zc.device_name is not None and device.name != zc.device_name:
+		return False
+
+	return True
+
+def _zones(zc: config.ZoneConfig, device) -> list:
+	if zc.zone is None:
+		return list(device.zones)
+
+	if isinstance(zc.zone, int):
+		return device.zones[zc.zone:zc.zone + 1]
+
+	return [z for z in device.zones if z.name == zc.zone]
+
+class Fanout:
+	"""Renders and writes frames to every configured zone of the devices
+	reachable through CLIENTS, one worker per client. Sensor-driven colors come
+	from the gradient LUT; zones are written as cfg.threshold and cfg.refresh
+	say."""
+
+	def __init__(self, clients: List[OpenRGBClient], cfg: config.Config, lut):
+		self.clients = clients
+
+		# Spread the devices we drive round-robin over the connections; each
+		#   connection sees the same device list, so indices carry over.
+		self.groups: List[List[ZoneTarget]] = [[] for _ in clients]
+		used = 0
+
+		for i, device in enumerate(clients[0].devices):
+			matching = [zc for zc in cfg.zones if _matches(zc, device)]
+
+			if not matching:
+				continue
+
+			device = clients[used % len(clients)].devices[i]
+			group = self.groups[used % len(clients)]
+			used += 1
+
+			# To make sure the device is in the right mode.
+			device.set_mode(matching[0].mode)
+
+			for zc in matching:
+				for zone in _zones(zc, device):
+					scene = render.Scene(len(zone.leds), render.build_layers(zc.layers, lut))
+					group.append(ZoneTarget(device, zone, scene, cfg.threshold, cfg.refresh))
+
+		self.groups = [g for g in self.groups if g]
+		self._pool = ThreadPoolExecutor(max_workers=max(len(self.groups), 1), thread_name_prefix='fanout')
+
+	@property
+	def targets(self) -> List[ZoneTarget]:
+		return [t for g in self.groups for t in g]
+
+	@classmethod
+	def connect(cls, cfg: config.Config, lut, **kwargs) -> 'Fanout':
+		"""Connect to the SDK server (KWARGS are passed to OpenRGBClient) with
+		as many connections as useful, up to cfg.connections."""
+
+		clients = [OpenRGBClient(**kwargs)]
+		wanted = sum(1 for d in clients[0].devices if any(_matches(zc, d) for zc in cfg.zones))
+
+		try:
+			while len(clients) < min(cfg.connections, wanted):
+				clients.append(OpenRGBClient(**kwargs))
+		except BaseException:
+			for c in clients:
+				c.disconnect()
+			raise
+
+		return cls(clients, cfg, lut)
+
+	@property
+	def animated(self) -> bool:
+		"""Whether any zone changes over time with steady sensors."""
+
+		return any(t.scene.animated for t in self.targets)
+
+	def render(self, signals: render.Signals, now: float):
+		"""Render every zone's frame for time NOW, given the normalized value
+		of each sensor."""
+
+		for g in self.groups:
+			for t in g:
+				t.scene.render(signals, now)
+
+	def _write_group(self, group: List[ZoneTarget]) -> int:
+		return sum(t.writer.write(t.frame()) for t in group)
+
+	def write(self) -> int:
+		"""Bring every zone up to date with its last rendered frame. Returns
+		the number of zones written. Raises the first error any connection
+		hit, after all of them have finished."""
+
+		futures = [self._pool.submit(self._write_group, g) for g in self.groups]
+
+		# Let every worker finish before raising, so that no connection is
+		#   still being written to when the caller goes to recover them.
+		wait(futures)
+
+		return sum([f.result() for f in futures])
+
+	def close(self, disconnect: bool = True):
+		"""Stop the workers and, if DISCONNECT, the client connections."""
+
+		self._pool.shutdown(wait=False)
+
+		if not disconnect:
+			return
+
+		for c in self.clients:
+			try:
+				c.disconnect()
+			except Exception:
+				pass
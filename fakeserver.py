@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+"""A stand-in OpenRGB SDK server with simulated devices.
+
+Speaks enough of the OpenRGB network protocol for OpenRGBClient to connect,
+enumerate devices, change modes and update LEDs, so the daemon can be
+exercised without real hardware. Latency, connection resets and a
+throughput cap can be simulated, and every request is counted."""
+
+import argparse
+import socket
+import socketserver
+import struct
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from openrgb import utils
+from openrgb.utils import DeviceType, PacketType
+
+PROTOCOL_VERSION = 4
+
+HEADER = struct.Struct('<4sIII')
+MAGIC = b'ORGB'
+
+class FakeDevice:
+	"""A simulated controller of type TYPE with one linear zone per entry of
+	ZONES, given as (name, LED count)."""
+
+	def __init__(self, name: str, type: DeviceType, zones: Sequence[Tuple[str, int]]):
+		self.name = name
+		self.type = type
+		self.zones = list(zones)
+		self.active_mode = 0
+		self.colors = [utils.RGBColor(0, 0, 0) for _ in range(sum(n for _, n in zones))]
+		self.lock = threading.Lock()
+
+	def zone_start(self, zone: int) -> int:
+		return sum(n for _, n in self.zones[:zone])
+
+	def pack(self, version: int) -> bytes:
+		direct = utils.ModeData(0, 'Direct', 0, utils.ModeFlags.HAS_PER_LED_COLOR, None, None, None, None, None, None, None, None, None, utils.ModeColors.PER_LED, None)
+		static = utils.ModeData(1, 'Static', 1, utils.ModeFlags.HAS_MODE_SPECIFIC_COLOR, None, None, None, None, 1, 1, None, None, None, utils.ModeColors.MODE_SPECIFIC, [utils.RGBColor(0, 0, 0)])
+		zones = [
+			utils.ZoneData(name, utils.ZoneType.LINEAR, n, n, n, 0, 0, segments=[])
+			for name, n in self.zones
+		]
+
+		with self.lock:
+			return utils.ControllerData(
+				self.name,
+				utils.MetaData('Fake', f'Simulated {self.type.name.lower()}', '1.0', '', 'fake'),
+				self.type,
+				[utils.LEDData(f'LED {i}', i) for i in range(len(self.colors))],
+				zones,
+				[direct, static],
+				list(self.colors),
+				self.active_mode,
+			).pack(version)
+
+DEFAULT_DEVICES = (
+	('Motherboard', DeviceType.MOTHERBOARD, (('Aura Mainboard', 1), ('Aura Addressable 1', 6))),
+	('DRAM 1', DeviceType.DRAM, (('DRAM', 5),)),
+	('DRAM 2', DeviceType.DRAM, (('DRAM', 5),)),
+	('GPU', DeviceType.GPU, (('GPU', 22),)),
+)
+
+class _Handler(socketserver.BaseRequestHandler):
+	server: '_TCPServer'
+
+	def _recv(self, n: int) -> bytes:
+		buf = bytearray()
+
+		while len(buf) < n:
+			chunk = self.request.recv(n - len(buf))
+
+			if not chunk:
+				raise ConnectionResetError()
+
+			buf += chunk
+
+		return bytes(buf)
+
+	def _send(self, device_id: int, packet_type: int, data: bytes):
+		self.request.sendall(HEADER.pack(MAGIC, device_id, packet_type, len(data)) + data)
+
+	def handle(self):
+		fake: FakeServer = self.server.fake
+		fake._count('connections')
+		version = 0
+
+		with fake._lock:
+			fake._sockets.add(self.request)
+
+		try:
+			while True:
+				magic, device_id, packet_type, size = HEADER.unpack(self._recv(HEADER.size))
+
+				if magic != MAGIC:
+					return
+
+				data = self._recv(size)
+				fake._received(HEADER.size + size)
+
+				if fake._should_reset():
+					fake._count('resets')
+					self.request.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack('ii', 1, 0))
+					return
+
+				if fake.latency:
+					time.sleep(fake.latency)
+
+				fake._count(PacketType(packet_type).name if packet_type in PacketType._value2member_map_ else f'packet {packet_type}')
+
+				if packet_type == PacketType.REQUEST_PROTOCOL_VERSION:
+					version = min(struct.unpack('<I', data)[0], fake.protocol_version)
+					self._send(0, packet_type, struct.pack('<I', fake.protocol_version))
+				elif packet_type == PacketType.REQUEST_CONTROLLER_COUNT:
+					self._send(0, packet_type, struct.pack('<I', len(fake.devices)))
+				elif packet_type == PacketType.REQUEST_CONTROLLER_DATA:
+					if len(data) >= 4:
+						version = struct.unpack('<I', data[:4])[0]
+
+					self._send(device_id, packet_type, fake.devices[device_id].pack(version))
+				elif packet_type in (PacketType.REQUEST_PROFILE_LIST, PacketType.REQUEST_PLUGIN_LIST):
+					# An empty list.
+					self._send(0, packet_type, struct.pack('<IH', 6, 0))
+				elif packet_type in (
+					PacketType.RGBCONTROLLER_UPDATELEDS,
+					PacketType.RGBCONTROLLER_UPDATEZONELEDS,
+					PacketType.RGBCONTROLLER_UPDATESINGLELED,
+					PacketType.RGBCONTROLLER_UPDATEMODE,
+					PacketType.RGBCONTROLLER_SETCUSTOMMODE,
+				):
+					fake._apply(fake.devices[device_id], packet_type, data)
+		except (ConnectionError, OSError, struct.error, IndexError):
+			pass
+		finally:
+			with fake._lock:
+				fake._sockets.discard(self.request)
+
+class _TCPServer(socketserver.ThreadingTCPServer):
+	allow_reuse_address = True
+	daemon_threads = True
+	fake: 'FakeServer'
+
+class FakeServer:
+	"""An SDK server for DEVICES listening on HOST:PORT (PORT 0 picks a free
+	port; see .port once started).
+
+	LATENCY seconds are added before handling each request. RESET_EVERY
+	drops the connection (with a reset) on every Nth request received,
+	counted across all connections. MAX_BYTES_PER_SEC caps the rate at which
+	request data is accepted."""
+
+	def __init__(self, devices: Optional[List[FakeDevice]] = None, host: str = '127.0.0.1', port: int = 0,
+			latency: float = 0.0, reset_every: Optional[int] = None, max_bytes_per_sec: Optional[float] = None,
+			protocol_version: int = PROTOCOL_VERSION):
+		if devices is None:
+			devices = [FakeDevice(*d) for d in DEFAULT_DEVICES]
+
+		self.devices = devices
+		self.latency = latency
+		self.reset_every = reset_every
+		self.max_bytes_per_sec = max_bytes_per_sec
+		self.protocol_version = protocol_version
+
+		self.stats: Counter = Counter()
+		self._lock = threading.Lock()
+		self._sockets: set = set()
+		self._packets = 0
+		self._budget_time = time.monotonic()
+
+		self._server = _TCPServer((host, port), _Handler, bind_and_activate=True)
+		self._server.fake = self
+		self._thread: Optional[threading.Thread] = None
+
+	@property
+	def port(self) -> int:
+		return self._server.server_address[1]
+
+	def start(self) -> 'FakeServer':
+		self._thread = threading.Thread(target=self._server.serve_forever, name='fakeserver', daemon=True)
+		self._thread.start()
+		return self
+
+	def stop(self):
+		self._server.shutdown()
+		self._server.server_close()
+		self.drop_connections()
+
+	def __enter__(self) -> 'FakeServer':
+		return self.start()
+
+	def __exit__(self, *exc):
+		self.stop()
+
+	def drop_connections(self):
+		"""Reset every open client connection, as a restarting server would."""
+
+		with self._lock:
+			sockets = list(self._sockets)
+
+		for s in sockets:
+			try:
+				s.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack('ii', 1, 0))
+				s.shutdown(socket.SHUT_RDWR)
+			except OSError:
+				pass
+
+	def _count(self, key: str, n: int = 1):
+		with self._lock:
+			self.stats[key] += n
+
+	def _should_reset(self) -> bool:
+		with self._lock:
+			self._packets += 1
+			return bool(self.reset_every) and self._packets % self.reset_every == 0
+
+	def _received(self, n: int):
+		self._count('bytes_in', n)
+
+		if not self.max_bytes_per_sec:
+			return
+
+		# Each request pushes the earliest time the next may be accepted
+		#   further out; sleep until then.
+		with self._lock:
+			now = time.monotonic()
+			self._budget_time = max(self._budget_time, now) + n / self.max_bytes_per_sec
+			delay = self._budget_time - now
+
+		time.sleep(delay)
+
+	def _apply(self, device: FakeDevice, packet_type: int, data: bytes):
+		def colors(offset: int, count: int) -> List[utils.RGBColor]:
+			return [utils.RGBColor(*data[offset + 4 * i:offset + 4 * i + 3]) for i in range(count)]
+
+		with device.lock:
+			if packet_type == PacketType.RGBCONTROLLER_UPDATEZONELEDS:
+				zone, count = struct.unpack_from('<iH', data, 4)
+				start = device.zone_start(zone)
+				device.colors[start:start + count] = colors(10, count)
+				self._count('zone_writes')
+			elif packet_type == PacketType.RGBCONTROLLER_UPDATELEDS:
+				count, = struct.unpack_from('<H', data, 4)
+				device.colors[:count] = colors(6, count)
+				self._count('device_writes')
+			elif packet_type == PacketType.RGBCONTROLLER_UPDATESINGLELED:
+				led, = struct.unpack_from('<i', data)
+				device.colors[led] = colors(4, 1)[0]
+				self._count('led_writes')
+			elif packet_type == PacketType.RGBCONTROLLER_UPDATEMODE:
+				device.active_mode, = struct.unpack_from('<i', data, 4)
+			elif packet_type == PacketType.RGBCONTROLLER_SETCUSTOMMODE:
+				device.active_mode = 0
+
+def _parse_device(spec: str) -> FakeDevice:
+	# TYPE=name:leds,name:leds,...
+	type_name, _, zones = spec.partition('=')
+	type = DeviceType[type_name.upper()]
+
+	return FakeDevice(type.name.title(), type, [
+		(name, int(n)) for name, _, n in (z.rpartition(':') for z in zones.split(','))
+	])
+
+def main():
+	parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+	parser.add_argument('--host', default='127.0.0.1')
+	parser.add_argument('--port', type=int, default=6742)
+	parser.add_argument('--device', action='append', type=_parse_device, metavar='TYPE=ZONE:LEDS,...',
+		help="simulate a device, e.g. MOTHERBOARD=Mainboard:1,Addressable:6 (repeatable; default: a motherboard, two DRAM sticks and a GPU)")
+	parser.add_argument('--latency', type=float, default=0.0, help="seconds added to every request")
+	parser.add_argument('--reset-every', type=int, help="reset the connection on every Nth request")
+	parser.add_argument('--max-bytes-per-sec', type=float, help="cap on accepted request data")
+	parser.add_argument('--stats-interval', type=float, default=5.0, help="seconds between printed statistics")
+	args = parser.parse_args()
+
+	server = FakeServer(args.device, args.host, args.port, args.latency, args.reset_every, args.max_bytes_per_sec)
+
+	with server:
+		print(f"listening on {args.host}:{server.port}")
+
+		try:
+			while True:
+				time.sleep(args.stats_interval)
+				print(dict(server.stats))
+		except KeyboardInterrupt:
+			pass
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,161 @@
+from array import array
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence
+
+# Smoothing sensor readings.
+#
+# Raw readings jitter by a degree or so from one sample to the next, and each
+# jitter would otherwise show up as a new color and a new write. Each sensor
+# can run its readings through a chain of filters before they are rendered:
+#
+#   median: the median of the last SIZE readings, which drops isolated spikes;
+#   ema: an exponential moving average, with weight ALPHA for the newest
+#     reading (1 passes readings through unchanged);
+#   hysteresis: holds its output until the input moves more than BAND (in
+#     the sensor's unit) away from it, so readings hovering around a value
+#     produce one output.
+#
+# Filters keep their history in fixed-size ring buffers, so their memory and
+# the cost of filtering a reading stay constant however long the daemon runs.
+
+class Ring:
+	"""The last SIZE values pushed, oldest first once full."""
+
+	def __init__(self, size: int):
+		if size < 1:
+			raise ValueError("a ring needs room for at least one value")
+
+		self.size = size
+		self.values = array('d', bytes(8 * size))
+		self.count = 0
+		self._next = 0
+
+	def push(self, value: float):
+		self.values[self._next] = value
+		self._next = (self._next + 1) % self.size
+		self.count = min(self.count + 1, self.size)
+
+	def __len__(self) -> int:
+		return self.count
+
+	def __iter__(self):
+		start = self._next - self.count
+
+		for i in range(start, self._next):
+			yield self.values[i % self.size]
+
+	def clear(self):
+		self.count = 0
+		self._next = 0
+
+class Filter:
+	def __call__(self, value: float) -> float:
+		raise NotImplementedError
+
+	def reset(self):
+		"""Forget all history, as after a gap in the readings."""
+
+class Median(Filter):
+	"""The median of the last SIZE readings (fewer until that many were seen)."""
+
+	def __init__(self, size: int = 3):
+		self.ring = Ring(size)
+
+	def __call__(self, value: float) -> float:
+		self.ring.push(value)
+		s = sorted(self.ring)
+		n = len(s)
+
+		return s[n // 2] if n % 2 else (s[n // 2 - 1] + s[n // 2]) / 2
+
+	def reset(self):
+		self.ring.clear()
+
+class EMA(Filter):
+	"""Exponential moving average giving the newest reading weight ALPHA."""
+
+	def __init__(self, alpha: float = 0.5):
+		if not 0 < alpha <= 1:
+			raise ValueError("alpha must be in (0, 1]")
+
+		self.alpha = alpha
+		self._value: Optional[float] = None
+
+	def __call__(self, value: float) -> float:
+		if self._value is None:
+			self._value = value
+		else:
+			self._value += self.alpha * (value - self._value)
+
+		return self._value
+
+	def reset(self):
+		self._value = None
+
+class Hysteresis(Filter):
+	"""Follows the input only once it has moved more than BAND away from the
+	last output."""
+
+	def __init__(self, band: float = 0.5):
+		self.band = band
+		self._value: Optional[float] = None
+
+	def __call__(self, value: float) -> float:
+		if self._value is None or abs(value - self._value) > self.band:
+			self._value = value
+
+		return self._value
+
+	def reset(self):
+		self._value = None
+
+class Chain(Filter):
+	"""FILTERS applied in order."""
+
+	def __init__(self, filters: Sequence[Filter]):
+		self.filters = list(filters)
+
+	def __call__(self, value: float) -> float:
+		for f in self.filters:
+			value = f(value)
+
+		return value
+
+	def reset(self):
+		for f in self.filters:
+			f.reset()
+
+_FILTERS = {'median': Median, 'ema': EMA, 'hysteresis': Hysteresis}
+
+def build_chain(spec: Sequence[Dict[str, Any]]) -> Chain:
+	"""Create the filter chain described by SPEC (see config.py)."""
+
+	filters: List[Filter] = []
+
+	for f in spec:
+		kind = f['type']
+
+		if kind not in _FILTERS:
+			raise ValueError(f"unknown filter type {kind!r}")
+
+		filters.append(_FILTERS[kind](**{k: v for k, v in f.items() if k != 'type'}))
+
+	return Chain(filters)
+
+class SensorFilters:
+	"""The filter chain of each sensor in SENSORS (a mapping of names to
+	SensorConfig)."""
+
+	def __init__(self, sensors: Mapping[str, Any]):
+		self.chains = {name: build_chain(s.filters) for name, s in sensors.items()}
+
+	def apply(self, readings: Mapping[str, float]) -> Dict[str, float]:
+		"""Filter READINGS (by sensor name)."""
+
+		return {name: self.chains[name](temp) for name, temp in readings.items()}
+
+	def reset(self, names: Optional[Iterable[str]] = None):
+		"""Forget the history of the sensors NAMES (by default all), as after
+		a gap in their readings."""
+
+		for name in self.chains if names is None else names:
+			self.chains[name].reset()
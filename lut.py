@@ -0,0 +1,246 @@
+from array import array
+from collections import namedtuple
+import hashlib
+import mmap
+import os
+import struct
+import sys
+from typing import Callable, Optional, Tuple
+
+import color
+import quadrature
+
+# Precomputed color gradients.
+#
+# Rendering a blackbody color means integrating Planck's law against the CIE
+# matching functions and converting through a color system, which is far too
+# much work to repeat on every tick for a mapping that never changes. A
+# GradientLUT samples such a mapping once over a fixed input range and then
+# answers lookups by linear interpolation between neighbouring entries.
+#
+# Tables can be saved to disk and memory-mapped back in, so that a restarted
+# daemon skips the spectral math entirely. Each file is keyed on everything
+# that went into it (see GradientLUT.digest() and Blackbody.key); a file built
+# from different parameters, matching functions, quadrature weights, locus fit
+# or file format is ignored and rebuilt.
+
+RGB = Tuple[float, float, float]
+
+# Bump whenever the file layout or the meaning of its contents changes.
+FORMAT_VERSION = 2
+
+# On-disk layout: magic, format version, key digest, steps, input range, all
+#   little-endian; then 3 * (steps + 1) native-endian doubles holding the
+#   sampled r, g, b values. The header is 64 bytes so the doubles are aligned.
+_HEADER = struct.Struct('<8sI32sIdd')
+_MAGIC = b'OTGRAD\0\0'
+
+def _cs_key(cs: color.ColorSystem) -> tuple:
+	# GAMMA_REC709 is a bare object(), whose repr changes between runs.
+	return cs._replace(gamma='REC709' if cs.gamma is color.GAMMA_REC709 else cs.gamma)
+
+class Blackbody(namedtuple('Blackbody', ('cs', 'temp_min', 'temp_max', 'scale_min', 'scale_max', 'gamma_correct', 'quadrature'), defaults=(False, 'table'))):
+	"""Maps a normalized temperature t (0 is cool, 1 is hot) onto the color of
+	a blackbody between TEMP_MIN and TEMP_MAX kelvin, rendered in the color
+	system CS and scaled in brightness from SCALE_MIN to SCALE_MAX.
+	Components lie between 0 and 1 (for scales up to 1), and are linear
+	unless GAMMA_CORRECT is set, in which case the transfer function of CS
+	is applied. Spectra are integrated with the named QUADRATURE (see
+	quadrature.get()); "planckian" skips them for the closed-form fit of the
+	Planckian locus (see color.planckian_xy())."""
+
+	__slots__ = ()
+
+	def __call__(self, t: float) -> RGB:
+		T = self.temp_min + t * (self.temp_max - self.temp_min)
+		tscale = self.scale_min + t * (self.scale_max - self.scale_min)
+
+		if self.quadrature == 'planckian':
+			x, y = color.planckian_xy(T)
+			z = 1 - x - y
+		else:
+			x, y, z = quadrature.get(self.quadrature).bb_to_xyz(T)
+
+		r, g, b = color.xyz_to_rgb(self.cs, x, y, z)
+		r, g, b = color.constrain_rgb(r, g, b)
+		r, g, b = color.norm_rgb(r, g, b)
+		r, g, b = r * tscale, g * tscale, b * tscale
+
+		if self.gamma_correct:
+			r, g, b = color.gamma_correct_rgb(self.cs, r, g, b)
+
+		return r, g, b
+
+	@property
+	def key(self) -> str:
+		# The quadrature or locus fit is named in the tuple; its data goes in
+		#   too, so that tables built before a change to it are not reused.
+		if self.quadrature == 'planckian':
+			data = (color._LOCUS_X, color._LOCUS_Y)
+		else:
+			quad = quadrature.get(self.quadrature)
+			data = (quad.nodes, quad.weights)
+
+		return f'{self._replace(cs=_cs_key(self.cs))!r} {hashlib.sha256(repr(data).encode()).hexdigest()}'
+
+# The daemon's mapping: 1000 K to 9000 K, dimmed slightly at the cool end.
+blackbody_rgb = Blackbody(color.SMPTE_SYSTEM, 1000, 9000, .75, 1.0)
+
+def _key(fn: Callable[[float], RGB]) -> str:
+	return getattr(fn, 'key', None) or f'{fn.__module__}.{fn.__qualname__}'
+
+class GradientLUT:
+	"""A mapping from a scalar input to an RGB color, sampled at STEPS + 1
+	evenly spaced points between LO and HI.
+
+	FN is either a plain function or an object (like Blackbody) with a key
+	attribute describing all of its parameters; that key is what saved tables
+	are matched against.
+
+	Inputs outside of the sampled range are clamped to it. With the default
+	range, 8000 steps gives one entry per kelvin of blackbody_rgb; 700 steps
+	gives one entry per 0.1 °C across the daemon's 30-100 °C span."""
+
+	def __init__(self, fn: Callable[[float], RGB], steps: int = 700, lo: float = 0.0, hi: float = 1.0, table=None):
+		if steps < 1:
+			raise ValueError("a gradient needs at least one step")
+
+		self.key = _key(fn)
+		self.steps = steps
+		self.lo = lo
+		self.hi = hi
+		self._scale = steps / (hi - lo)
+
+		if table is None:
+			table = array('d')
+
+			for i in range(steps + 1):
+				table.extend(fn(lo + i * (hi - lo) / steps))
+
+		# An array, or a memoryview of a mapped file.
+		self._table = table
+
+	def lookup_rgb(self, t: float) -> RGB:
+		"""Return the interpolated linear color for input T."""
+
+		pos = (t - self.lo) * self._scale
+
+		if pos <= 0:
+			i, f = 0, 0.0
+		elif pos >= self.steps:
+			i, f = self.steps - 1, 1.0
+		else:
+			i = int(pos)
+			f = pos - i
+
+		tab = self._table
+		j = 3 * i
+
+		return (
+			tab[j    ] + (tab[j + 3] - tab[j    ]) * f,
+			tab[j + 1] + (tab[j + 4] - tab[j + 1]) * f,
+			tab[j + 2] + (tab[j + 5] - tab[j + 2]) * f,
+		)
+
+	def lookup(self, t: float) -> Tuple[int, int, int]:
+		"""Return the interpolated color for input T as 8-bit components."""
+
+		r, g, b = self.lookup_rgb(t)
+
+		return int(r * 255), int(g * 255), int(b * 255)
+
+	@staticmethod
+	def digest(key: str, steps: int, lo: float, hi: float) -> bytes:
+		"""Identifies a table built from the mapping described by KEY with the
+		given resolution and range, by the current matching functions, on a
+		machine of this byte order."""
+
+		h = hashlib.sha256()
+		h.update(repr((FORMAT_VERSION, sys.byteorder, key, steps, lo, hi)).encode())
+		h.update(repr(color.CIE_COLOR_MATCH).encode())
+
+		return h.digest()
+
+	def save(self, path: str):
+		"""Write the table to PATH, atomically replacing any existing file."""
+
+		import tempfile
+
+		d = os.path.dirname(path) or '.'
+		fd, tmp = tempfile.mkstemp(dir=d, prefix='.gradient-')
+
+		try:
+			with os.fdopen(fd, 'wb') as f:
+				f.write(_HEADER.pack(_MAGIC, FORMAT_VERSION, self.digest(self.key, self.steps, self.lo, self.hi), self.steps, self.lo, self.hi))
+				f.write(memoryview(self._table).cast('B'))
+
+			os.replace(tmp, path)
+		except BaseException:
+			try:
+				os.unlink(tmp)
+			except OSError:
+				pass
+
+			raise
+
+	@classmethod
+	def load(cls, path: str, fn: Callable[[float], RGB], steps: int = 700, lo: float = 0.0, hi: float = 1.0) -> 'GradientLUT':
+		"""Memory-map a table saved by save(). Raises ValueError if the file was
+		not built from FN with the same resolution and range."""
+
+		with open(path, 'rb') as f:
+			size = os.fstat(f.fileno()).st_size
+			expected = _HEADER.size + 3 * (steps + 1) * 8
+
+			if size != expected:
+				raise ValueError(f"{path} is {size} bytes, expected {expected}")
+
+			mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+		try:
+			magic, version, digest, *_ = _HEADER.unpack_from(mm)
+
+			if magic != _MAGIC or version != FORMAT_VERSION or digest != cls.digest(_key(fn), steps, lo, hi):
+				raise ValueError(f"{path} does not hold a matching table")
+		except BaseException:
+			mm.close()
+			raise
+
+		return cls(fn, steps, lo, hi, memoryview(mm)[_HEADER.size:].cast('d'))
+
+	@classmethod
+	def load_or_build(cls, fn: Callable[[float], RGB], path: Optional[str] = None, steps: int = 700, lo: float = 0.0, hi: float = 1.0) -> 'GradientLUT':
+		"""Load the table for FN from PATH if it holds a matching one,
+		otherwise build it and (if PATH is given) save it there."""
+
+		if path is not None:
+			try:
+				return cls.load(path, fn, steps, lo, hi)
+			except (OSError, ValueError):
+				pass
+
+		lut = cls(fn, steps, lo, hi)
+
+		if path is not None:
+			try:
+				os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+				lut.save(path)
+			except OSError as e:
+				print(f"could not save gradient to {path}: {e}")
+
+		return lut
+
+def cache_name(name: str, fn: Callable[[float], RGB]) -> str:
+	"""A file name for the gradient NAME built from FN, distinct for every
+	variant of FN, so that differently configured tables do not take turns
+	overwriting one file."""
+
+	return f'{name}-{hashlib.sha256(_key(fn).encode()).hexdigest()[:16]}'
+
+def default_cache_path(name: str) -> str:
+	"""Where to keep the gradient NAME between runs: under $XDG_CACHE_HOME
+	(or ~/.cache)."""
+
+	base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+
+	return os.path.join(base, 'openrgb-temperature', name + '.lut')
@@ -0,0 +1,202 @@
+from bisect import bisect_left
+from contextlib import contextmanager
+import os
+import threading
+from time import perf_counter
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Counters, gauges and timing histograms for the daemon, exposed in the
+# Prometheus text format over HTTP or a Unix socket.
+#
+# Recording is a few dict and list operations so it can stay on the hot path;
+# the text is only rendered when someone asks for it. The server modules are
+# only imported once serve() is called.
+
+# Upper bounds (seconds) of the default histogram buckets, from 100 µs to 2.5 s.
+DEFAULT_BUCKETS = (.0001, .00025, .0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1, 2.5)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+def _escape(value: str) -> str:
+	# Label values may come from the configuration (sensor names).
+	return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _format_labels(labels: Labels, extra: str = '') -> str:
+	parts = [f'{k}="{_escape(v)}"' for k, v in labels]
+
+	if extra:
+		parts.append(extra)
+
+	return '{' + ','.join(parts) + '}' if parts else ''
+
+class Histogram:
+	"""Counts observations into buckets with the given upper BOUNDS."""
+
+	def __init__(self, bounds: Sequence[float] = DEFAULT_BUCKETS):
+		self.bounds = tuple(bounds)
+		self.counts = [0] * (len(self.bounds) + 1)
+		self.sum = 0.0
+		self.count = 0
+
+	def observe(self, value: float):
+		self.counts[bisect_left(self.bounds, value)] += 1
+		self.sum += value
+		self.count += 1
+
+	def lines(self, name: str, labels: Labels) -> Iterator[str]:
+		cumulative = 0
+
+		for bound, n in zip(self.bounds + (float('inf'),), self.counts):
+			cumulative += n
+			le = '+Inf' if bound == float('inf') else repr(bound)
+			bucket = _format_labels(labels, 'le="' + le + '"')
+			yield f'{name}_bucket{bucket} {cumulative}'
+
+		yield f'{name}_sum{_format_labels(labels)} {self.sum}'
+		yield f'{name}_count{_format_labels(labels)} {self.count}'
+
+class Metrics:
+	"""A set of named metrics. Each name holds one kind of metric (counter,
+	gauge or histogram), optionally split by labels."""
+
+	def __init__(self):
+		self._lock = threading.Lock()
+		self._kinds: Dict[str, str] = {}
+		self._help: Dict[str, str] = {}
+		self._values: Dict[str, Dict[Labels, object]] = {}
+
+	def describe(self, name: str, kind: str, help: str = ''):
+		"""Declare NAME as a metric of KIND ('counter', 'gauge' or
+		'histogram'). Metrics are also declared implicitly on first use."""
+
+		with self._lock:
+			self._kinds[name] = kind
+			self._help[name] = help
+			self._values.setdefault(name, {})
+
+	def _series(self, name: str, kind: str, labels: Dict[str, str]) -> Tuple[Dict[Labels, object], Labels]:
+		values = self._values.get(name)
+
+		if values is None:
+			self.describe(name, kind)
+			values = self._values[name]
+
+		return values, tuple(sorted(labels.items()))
+
+	def inc(self, name: str, n: float = 1, **labels: str):
+		values, key = self._series(name, 'counter', labels)
+
+		with self._lock:
+			values[key] = values.get(key, 0) + n
+
+	def set(self, name: str, value: float, **labels: str):
+		values, key = self._series(name, 'gauge', labels)
+
+		with self._lock:
+			values[key] = value
+
+	def observe(self, name: str, value: float, **labels: str):
+		values, key = self._series(name, 'histogram', labels)
+
+		with self._lock:
+			hist = values.get(key)
+
+			if hist is None:
+				hist = values[key] = Histogram()
+
+			hist.observe(value)  # type: ignore
+
+	@contextmanager
+	def time(self, name: str, **labels: str):
+		"""Observe the time spent in the with block, in seconds, into the
+		histogram NAME."""
+
+		start = perf_counter()
+
+		try:
+			yield
+		finally:
+			self.observe(name, perf_counter() - start, **labels)
+
+	def get(self, name: str, **labels: str) -> Optional[object]:
+		return self._values.get(name, {}).get(tuple(sorted(labels.items())))
+
+	def render(self) -> str:
+		"""The current values, in the Prometheus text exposition format."""
+
+		out: List[str] = []
+
+		with self._lock:
+			for name, values in self._values.items():
+				if self._help[name]:
+					out.append(f'# HELP {name} {self._help[name]}')
+
+				out.append(f'# TYPE {name} {self._kinds[name]}')
+
+				for labels, value in values.items():
+					if isinstance(value, Histogram):
+						out.extend(value.lines(name, labels))
+					else:
+						out.append(f'{name}{_format_labels(labels)} {value}')
+
+		return '\n'.join(out) + '\n'
+
+def _unix_path(address: str) -> Optional[str]:
+	# ADDRESS as a Unix socket path, or None for HOST:PORT.
+	if address.startswith('unix:'):
+		return address[len('unix:'):]
+
+	_, sep, port = address.rpartition(':')
+
+	return None if sep and port.isdigit() else address
+
+def serve(metrics: Metrics, address: str):
+	"""Serve METRICS in a background thread. ADDRESS is either HOST:PORT (or
+	just :PORT), for an HTTP endpoint at /metrics, or the path of a Unix
+	socket that writes the metrics to each connecting client and closes:
+	anything without a numeric port, or with a unix: prefix. Returns the
+	server."""
+
+	from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+	import socketserver
+
+	class HTTPHandler(BaseHTTPRequestHandler):
+		def do_GET(self):
+			if self.path not in ('/', '/metrics'):
+				self.send_error(404)
+				return
+
+			body = metrics.render().encode()
+			self.send_response(200)
+			self.send_header('Content-Type', 'text/plain; version=0.0.4')
+			self.send_header('Content-Length', str(len(body)))
+			self.end_headers()
+			self.wfile.write(body)
+
+		def log_message(self, format, *args):
+			pass
+
+	class UnixHandler(socketserver.StreamRequestHandler):
+		def handle(self):
+			self.wfile.write(metrics.render().encode())
+
+	class UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+		daemon_threads = True
+
+	path = _unix_path(address)
+
+	if path is not None:
+		try:
+			os.unlink(path)
+		except FileNotFoundError:
+			pass
+
+		server: socketserver.BaseServer = UnixServer(path, UnixHandler)
+	else:
+		host, _, port = address.rpartition(':')
+		server = ThreadingHTTPServer((host or '127.0.0.1', int(port)), HTTPHandler)
+		server.daemon_threads = True
+
+	threading.Thread(target=server.serve_forever, name='metrics', daemon=True).start()
+
+	return server
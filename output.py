@@ -0,0 +1,231 @@
+from math import sqrt
+import socket
+import struct
+from time import monotonic
+from typing import Callable, Optional, Sequence, Tuple, Union
+
+from openrgb.utils import OpenRGBDisconnected, PacketType
+
+# Writing to devices.
+#
+# Every zone update is a round trip to the OpenRGB SDK server, and most ticks
+# produce the same frame as the one before. A ZoneWriter remembers what it
+# last sent to a zone and drops frames that would not visibly change it.
+#
+# Frames live in FrameBuffers laid out as the colors of an UpdateZoneLEDs
+# request. Each ZoneWriter keeps the whole request for its zone in a
+# ZonePacket, whose frame is a view of the color bytes: rendering into it
+# updates the request in place, and sending is a single sendall() of a
+# buffer that never changes size. Neither comparing nor sending a frame
+# creates an object per LED.
+
+# Packet header: magic, device index, packet type, size of what follows.
+_HEADER = struct.Struct('<4sIII')
+
+# UpdateZoneLEDs payload: total size, zone index, LED count, then the colors.
+_ZONE_LEDS = struct.Struct('<IiH')
+
+_NOSIGNAL = getattr(socket, 'MSG_NOSIGNAL', 0)
+
+def color_distance(a: Tuple[int, int, int], b: Tuple[int, int, int]) -> float:
+	"""Approximate perceived difference between two 8-bit colors, using the
+	"redmean" weighted Euclidean distance. Ranges from 0 to about 765."""
+
+	rmean = (a[0] + b[0]) / 2
+	dr = a[0] - b[0]
+	dg = a[1] - b[1]
+	db = a[2] - b[2]
+
+	return sqrt((2 + rmean / 256) * dr * dr + 4 * dg * dg + (2 + (255 - rmean) / 256) * db * db)
+
+# Zones of at least this many LEDs are filled through NumPy, if it is
+#   installed. It takes a while to import, and only pays for itself on long
+#   strips.
+NUMPY_MIN_LEDS = 64
+
+def _numpy():
+	try:
+		import numpy
+	except ImportError:
+		return None
+
+	return numpy
+
+class FrameBuffer:
+	"""The colors of a zone of LEDS LEDs, packed the way the SDK sends them:
+	red, green, blue and a padding byte per LED. DATA, if given, is the
+	writable buffer to keep them in."""
+
+	def __init__(self, leds: int, data: Optional[Union[bytearray, memoryview]] = None):
+		self.leds = leds
+		self.data = bytearray(4 * leds) if data is None else data
+
+		# Where each component of each LED goes in DATA, in order.
+		self._offsets = [4 * (i // 3) + i % 3 for i in range(3 * leds)]
+
+		self._np = _numpy() if leds >= NUMPY_MIN_LEDS else None
+
+		if self._np is not None:
+			self._colors = self._np.frombuffer(self.data, dtype=self._np.uint8).reshape(leds, 4)[:, :3]
+			self._scaled = self._np.empty((leds, 3))
+
+	def __len__(self) -> int:
+		return self.leds
+
+	def __getitem__(self, i: int) -> Tuple[int, int, int]:
+		j = 4 * i
+		return self.data[j], self.data[j + 1], self.data[j + 2]
+
+	def fill(self, rgb: Sequence[float]):
+		"""Set the colors from RGB, 3 linear components in [0, 1] per LED (as
+		in a render.Scene buffer). Components outside that range are clamped
+		to it. Writes straight into the buffer."""
+
+		np = self._np
+
+		if np is not None:
+			scaled = self._scaled
+			np.multiply(np.asarray(rgb, dtype=np.float64).reshape(scaled.shape), 255, out=scaled)
+			np.clip(scaled, 0, 255, out=scaled)
+			# Truncates, as int() does.
+			self._colors[...] = scaled
+			return
+
+		data = self.data
+
+		try:
+			for j, v in zip(self._offsets, rgb):
+				data[j] = int(v * 255)
+		except ValueError:
+			for j, v in zip(self._offsets, rgb):
+				data[j] = 255 if v >= 1 else int(v * 255) if v > 0 else 0
+
+class ZonePacket:
+	"""A complete UpdateZoneLEDs request for ZONE (an openrgb Zone). FRAME is
+	a FrameBuffer over its color bytes."""
+
+	def __init__(self, zone):
+		leds = len(zone.leds)
+		size = _ZONE_LEDS.size + 4 * leds
+
+		self.zone = zone
+		self.packet = bytearray(_HEADER.size + size)
+		_HEADER.pack_into(self.packet, 0, b'ORGB', zone.device_id, PacketType.RGBCONTROLLER_UPDATEZONELEDS, size)
+		_ZONE_LEDS.pack_into(self.packet, _HEADER.size, size, zone.id, leds)
+		self.frame = FrameBuffer(leds, memoryview(self.packet)[_HEADER.size + _ZONE_LEDS.size:])
+
+	def send(self):
+		"""Send the request over the zone's connection. Like
+		zone.set_colors(..., fast=True), but as one write of this buffer."""
+
+		comms = self.zone.comms
+
+		if not comms.connected:
+			raise OpenRGBDisconnected()
+
+		# Taking the client's lock keeps us from interleaving with its own
+		#   requests on the same socket.
+		lock = comms.lock
+
+		if not lock.acquire(timeout=10):
+			raise OpenRGBDisconnected("SDK server did not respond to previous request")
+
+		try:
+			comms.sock.sendall(self.packet, _NOSIGNAL)
+		except OSError as e:
+			# Whatever broke the send, part of the request may have gone out;
+			#   the connection is no use until it is reopened. This releases
+			#   the lock we hold and closes the socket; the client keeps the
+			#   same lock object.
+			comms.stop_connection()
+			raise OpenRGBDisconnected() from e
+		except BaseException:
+			lock.release()
+			raise
+
+		lock.release()
+
+class ZoneWriter:
+	"""Sends frames to ZONE (an openrgb Zone, see ZonePacket), skipping
+	frames where no LED differs from the last frame sent by more than
+	THRESHOLD (see color_distance()). Frames are cheapest to write when
+	rendered straight into .frame.
+
+	The last frame is resent regardless once REFRESH seconds have passed
+	since the previous write, in case the device was changed behind our back.
+	Pass None to never force a refresh."""
+
+	def __init__(self, zone, threshold: float = 0, refresh: Optional[float] = 30.0, clock: Callable[[], float] = monotonic):
+		self.zone = zone
+		self.threshold = threshold
+		self.refresh = refresh
+		self.clock = clock
+
+		self.sent = 0
+		self.skipped = 0
+
+		self._packet = ZonePacket(zone)
+		self.frame = self._packet.frame
+
+		self._last: Optional[bytearray] = None
+		self._last_time = 0.0
+
+	def _changed(self, frame: FrameBuffer) -> bool:
+		last = self._last
+		data = frame.data
+
+		if last is None or len(last) != len(data):
+			return True
+
+		if last == data:
+			return False
+
+		if self.threshold <= 0:
+			return True
+
+		threshold = self.threshold
+
+		for i in range(0, len(data), 4):
+			a = (last[i], last[i + 1], last[i + 2])
+			b = (data[i], data[i + 1], data[i + 2])
+
+			if a != b and color_distance(a, b) > threshold:
+				return True
+
+		return False
+
+	def write(self, frame: Optional[FrameBuffer] = None) -> bool:
+		"""Send FRAME (by default .frame) to the zone if needed. Returns
+		whether anything was sent."""
+
+		if frame is None:
+			frame = self.frame
+		elif frame is not self.frame:
+			if len(frame) != len(self.frame):
+				raise IndexError("Number of colors doesn't match number of LEDs in the zone")
+
+			self.frame.data[:] = frame.data
+
+		frame = self.frame
+		now = self.clock()
+
+		if not self._changed(frame) and (self.refresh is None or now - self._last_time < self.refresh):
+			self.skipped += 1
+			return False
+
+		self._packet.send()
+
+		if self._last is None or len(self._last) != len(frame.data):
+			self._last = bytearray(frame.data)
+		else:
+			self._last[:] = frame.data
+
+		self._last_time = now
+		self.sent += 1
+
+		return True
+
+	def reset(self):
+		"""Forget the last frame, so the next write always goes out."""
+
+		self._last = None
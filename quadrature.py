@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+from functools import lru_cache
+from math import cos, exp, pi
+from time import perf_counter
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+import color
+
+# Integrating spectra against the CIE matching functions.
+#
+# color.spectrum_to_xyz() evaluates the spectrum at all 81 wavelengths of
+# CIE_COLOR_MATCH. Smooth spectra such as a black body's give nearly the same
+# chromaticity from far fewer evaluations, so a Quadrature integrates with any
+# set of nodes (wavelengths in nm) and per-node weights for X, Y and Z:
+#
+#   TABLE: the 5 nm table itself, the same as color.spectrum_to_xyz();
+#   reduced(n): N evenly spaced nodes, weighted so that the result is what
+#     the table gives for the spectrum interpolated between them;
+#   analytic(n): N Gauss-Legendre nodes over the CIE 1931 matching functions
+#     as fitted by sums of piecewise Gaussians (Wyman, Sloan and Shirley,
+#     "Simple Analytic Approximations to the CIE XYZ Color Matching
+#     Functions", JCGT 2013), with no table at all.
+#
+# Run this module for an accuracy report of each against the table over the
+# daemon's blackbody range, along with the Planckian locus fit that lut.py can
+# use in place of any of them (see color.planckian_xy()).
+
+WL_MIN = 380
+WL_MAX = 780
+WL_STEP = 5
+
+XYZ = Tuple[float, float, float]
+
+class Quadrature:
+	"""Integrates spectra as sum(spectrum(NODES[i]) * WEIGHTS[i]), with a
+	weight for each of X, Y and Z per node."""
+
+	def __init__(self, name: str, nodes: Sequence[float], weights: Sequence[XYZ]):
+		if len(nodes) != len(weights):
+			raise ValueError("a quadrature needs one weight triple per node")
+
+		self.name = name
+		self.nodes = tuple(nodes)
+		self.weights = tuple(weights)
+		self.planck = color.PlanckKernel(self.nodes)
+
+	def __len__(self) -> int:
+		return len(self.nodes)
+
+	def __repr__(self) -> str:
+		return f'Quadrature({self.name!r})'
+
+	def spectrum_to_xyz(self, spec_intens: Callable[[float], float]) -> XYZ:
+		"""Like color.spectrum_to_xyz(): the chromaticity x, y, z (summing to
+		1) of the spectrum SPEC_INTENS, a function of wavelength in nm."""
+
+		X, Y, Z = 0.0, 0.0, 0.0
+
+		for λ, (wx, wy, wz) in zip(self.nodes, self.weights):
+			Me = spec_intens(λ)
+
+			X += Me * wx
+			Y += Me * wy
+			Z += Me * wz
+
+		XYZ = X + Y + Z
+
+		return X / XYZ, Y / XYZ, Z / XYZ
+
+	def bb_to_xyz(self, bb_temp: float) -> XYZ:
+		"""spectrum_to_xyz(color.bb_spectrum(BB_TEMP)), from Planck's law
+		evaluated straight at the nodes."""
+
+		X, Y, Z = 0.0, 0.0, 0.0
+
+		for Me, (wx, wy, wz) in zip(self.planck(bb_temp), self.weights):
+			X += Me * wx
+			Y += Me * wy
+			Z += Me * wz
+
+		XYZ = X + Y + Z
+
+		return X / XYZ, Y / XYZ, Z / XYZ
+
+TABLE = Quadrature('table', [WL_MIN + i * WL_STEP for i in range(len(color.CIE_COLOR_MATCH))], color.CIE_COLOR_MATCH)
+
+def reduced(n: int) -> Quadrature:
+	"""N nodes spread evenly from 380 to 780 nm. Each table wavelength shares
+	its matching function values among the four nodes around it, by their
+	cubic Lagrange interpolation weights, so the result is what the table
+	gives for the spectrum interpolated piecewise cubically between nodes."""
+
+	if n < 4:
+		raise ValueError("a reduced quadrature needs at least four nodes")
+
+	span = WL_MAX - WL_MIN
+	nodes = [WL_MIN + j * span / (n - 1) for j in range(n)]
+	weights = [[0.0, 0.0, 0.0] for _ in range(n)]
+
+	for λ, cm in zip(TABLE.nodes, TABLE.weights):
+		pos = (λ - WL_MIN) * (n - 1) / span
+		first = min(max(int(pos) - 1, 0), n - 4)
+
+		for j in range(first, first + 4):
+			l = 1.0
+
+			for m in range(first, first + 4):
+				if m != j:
+					l *= (pos - m) / (j - m)
+
+			for k in range(3):
+				weights[j][k] += l * cm[k]
+
+	return Quadrature(f'reduced:{n}', nodes, [tuple(w) for w in weights])
+
+def _lobe(λ: float, mu: float, sigma_lo: float, sigma_hi: float) -> float:
+	t = (λ - mu) / (sigma_lo if λ < mu else sigma_hi)
+	return exp(-0.5 * t * t)
+
+def cmf_analytic(λ: float) -> XYZ:
+	"""The multi-lobe Gaussian fit of the CIE 1931 2° matching functions
+	xBar, yBar, zBar at wavelength λ (nm)."""
+
+	return (
+		1.056 * _lobe(λ, 599.8, 37.9, 31.0) + 0.362 * _lobe(λ, 442.0, 16.0, 26.7) - 0.065 * _lobe(λ, 501.1, 20.4, 26.2),
+		0.821 * _lobe(λ, 568.8, 46.9, 40.5) + 0.286 * _lobe(λ, 530.9, 16.3, 31.1),
+		1.217 * _lobe(λ, 437.0, 11.8, 36.0) + 0.681 * _lobe(λ, 459.0, 26.0, 13.8),
+	)
+
+def gauss_legendre(n: int) -> List[Tuple[float, float]]:
+	"""The N nodes and weights of Gauss-Legendre quadrature on [-1, 1]."""
+
+	out = []
+
+	for i in range(1, n + 1):
+		# Newton's method on P_n from the usual initial guess.
+		x = cos(pi * (i - 0.25) / (n + 0.5))
+
+		for _ in range(100):
+			p0, p1 = 1.0, x
+
+			for k in range(2, n + 1):
+				p0, p1 = p1, ((2 * k - 1) * x * p1 - (k - 1) * p0) / k
+
+			dp = n * (x * p1 - p0) / (x * x - 1)
+			dx = p1 / dp
+			x -= dx
+
+			if abs(dx) < 1e-15:
+				break
+
+		out.append((x, 2 / ((1 - x * x) * dp * dp)))
+
+	return sorted(out)
+
+def analytic(n: int = 16) -> Quadrature:
+	"""N Gauss-Legendre nodes over 380 to 780 nm, weighted by the analytic
+	matching functions (see cmf_analytic())."""
+
+	if n < 1:
+		raise ValueError("an analytic quadrature needs at least one node")
+
+	half = (WL_MAX - WL_MIN) / 2
+	mid = (WL_MAX + WL_MIN) / 2
+	nodes = []
+	weights = []
+
+	for x, w in gauss_legendre(n):
+		λ = mid + half * x
+		nodes.append(λ)
+		weights.append(tuple(w * half * c for c in cmf_analytic(λ)))
+
+	return Quadrature(f'analytic:{n}', nodes, weights)
+
+@lru_cache(maxsize=None)
+def get(name: str) -> Quadrature:
+	"""The quadrature called NAME: "table", "reduced:N" or "analytic:N" (N
+	defaults to 21 and 16 respectively)."""
+
+	kind, _, n = name.partition(':')
+
+	try:
+		if kind == 'table' and not n:
+			return TABLE
+
+		if kind == 'reduced':
+			return reduced(int(n or 21))
+
+		if kind == 'analytic':
+			return analytic(int(n or 16))
+	except ValueError:
+		pass
+
+	raise ValueError(f"unknown quadrature {name!r}")
+
+def _stray(chromaticity: Callable[[float], Tuple[float, float]], temps: List[float]) -> Dict[str, float]:
+	dx = dy = 0.0
+	start = perf_counter()
+
+	for T in temps:
+		chromaticity(T)
+
+	elapsed = perf_counter() - start
+
+	for T in temps:
+		x, y = chromaticity(T)
+		x0, y0, _ = TABLE.spectrum_to_xyz(color.bb_spectrum(T))
+		dx = max(dx, abs(x - x0))
+		dy = max(dy, abs(y - y0))
+
+	return {'max_dx': dx, 'max_dy': dy, 'us': elapsed / len(temps) * 1e6}
+
+def accuracy(quad: Quadrature, temps: Iterable[float] = range(1000, 9001, 100)) -> Dict[str, float]:
+	"""How far the chromaticities QUAD gives for black bodies at TEMPS (K)
+	stray from TABLE's: the largest difference in x and in y, and the time
+	per spectrum in µs."""
+
+	return {'nodes': len(quad), **_stray(lambda T: quad.bb_to_xyz(T)[:2], list(temps))}
+
+def planckian_accuracy(temps: Iterable[float] = range(1000, 9001, 100)) -> Dict[str, float]:
+	"""Like accuracy(), for the Planckian locus fit color.planckian_xy(),
+	which needs no spectrum at all."""
+
+	return {'nodes': 0, **_stray(color.planckian_xy, list(temps))}
+
+if __name__ == '__main__':
+	print("Quadrature        Nodes    max |Δx|    max |Δy|     µs")
+	print("---------------   -----   ---------   ---------   -----")
+
+	for name in ('table', 'reduced:41', 'reduced:21', 'reduced:11', 'analytic:32', 'analytic:16', 'analytic:8', 'planckian'):
+		r = planckian_accuracy() if name == 'planckian' else accuracy(get(name))
+		print(f"{name:15}   {r['nodes']:5}   {r['max_dx']:9.2e}   {r['max_dy']:9.2e}   {r['us']:5.1f}")
@@ -0,0 +1,260 @@
+from array import array
+from math import cos, pi
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+# Composing LED frames.
+#
+# A Scene renders one zone: it owns a preallocated buffer of 3 floats (linear
+# r, g, b in [0, 1]) per LED and draws a stack of layers into it each frame.
+# Each layer covers a span of the zone's LEDs and is fed the current value of
+# every sensor, normalized so 0 is its configured minimum and 1 its maximum.
+#
+# Layers precompute whatever does not depend on the sensors when they are
+# bound to a zone, and then only copy slices of preallocated arrays or scale
+# buffer entries in place while rendering, so that long strips can be redrawn
+# many times a second.
+
+RGB = Tuple[float, float, float]
+Signals = Mapping[str, float]
+
+class Layer:
+	"""Draws onto LEDs START to START + COUNT of a zone (COUNT None for the
+	rest of the zone)."""
+
+	# Whether the layer changes over time by itself, even with steady sensors.
+	animated = False
+
+	def __init__(self, start: int = 0, count: Optional[int] = None):
+		self.start = start
+		self.count = count
+
+	def bind(self, leds: int):
+		"""Prepare to draw on a zone of LEDS LEDs."""
+
+		self.lo = min(self.start, leds)
+		self.hi = leds if self.count is None else min(self.start + self.count, leds)
+
+	def render(self, buf: array, signals: Signals, now: float):
+		raise NotImplementedError
+
+class Solid(Layer):
+	"""A fixed COLOR."""
+
+	def __init__(self, color: RGB, start: int = 0, count: Optional[int] = None):
+		super().__init__(start, count)
+		self.color = color
+
+	def bind(self, leds: int):
+		super().bind(leds)
+		self._fill = array('d', self.color) * (self.hi - self.lo)
+
+	def render(self, buf: array, signals: Signals, now: float):
+		buf[3 * self.lo:3 * self.hi] = self._fill
+
+class SensorColor(Layer):
+	"""The color of SOURCE's current value, from the gradient LUT."""
+
+	def __init__(self, source: str, lut, start: int = 0, count: Optional[int] = None):
+		super().__init__(start, count)
+		self.source = source
+		self.lut = lut
+
+	def render(self, buf: array, signals: Signals, now: float):
+		r, g, b = self.lut.lookup_rgb(signals[self.source])
+
+		for i in range(3 * self.lo, 3 * self.hi, 3):
+			buf[i] = r
+			buf[i + 1] = g
+			buf[i + 2] = b
+
+def _ramp(lut, lo: float, hi: float, n: int) -> array:
+	# LUT colors from LO to HI spread evenly over N LEDs.
+	out = array('d')
+
+	for i in range(n):
+		out.extend(lut.lookup_rgb(lo + (hi - lo) * (i / (n - 1) if n > 1 else 0)))
+
+	return out
+
+class Gradient(Layer):
+	"""The gradient LUT laid out along the LEDs, from LUT input LO at the first
+	LED to HI at the last."""
+
+	def __init__(self, lut, lo: float = 0.0, hi: float = 1.0, start: int = 0, count: Optional[int] = None):
+		super().__init__(start, count)
+		self.lut = lut
+		self.range = (lo, hi)
+
+	def bind(self, leds: int):
+		super().bind(leds)
+		self._colors = _ramp(self.lut, *self.range, self.hi - self.lo)
+
+	def render(self, buf: array, signals: Signals, now: float):
+		buf[3 * self.lo:3 * self.hi] = self._colors
+
+class Meter(Layer):
+	"""A bar graph of SOURCE: the first LEDs light up in proportion to its
+	value, each in the gradient color of its position, with the last lit LED
+	dimmed to show the remainder. The other LEDs show BACKGROUND."""
+
+	def __init__(self, source: str, lut, background: RGB = (0.0, 0.0, 0.0), start: int = 0, count: Optional[int] = None):
+		super().__init__(start, count)
+		self.source = source
+		self.lut = lut
+		self.background = background
+
+	def bind(self, leds: int):
+		super().bind(leds)
+		n = self.hi - self.lo
+		self._colors = _ramp(self.lut, 0.0, 1.0, n)
+		self._background = array('d', self.background) * n
+		self._colors_view = memoryview(self._colors)
+		self._background_view = memoryview(self._background)
+
+	def render(self, buf: array, signals: Signals, now: float):
+		n = self.hi - self.lo
+		lit = min(max(signals[self.source], 0.0), 1.0) * n
+		full = int(lit)
+		base = 3 * self.lo
+
+		# Slicing the arrays themselves would copy them; views do not.
+		out = memoryview(buf)
+		out[base:base + 3 * full] = self._colors_view[:3 * full]
+		out[base + 3 * full:3 * self.hi] = self._background_view[3 * full:]
+
+		if full < n:
+			f = lit - full
+			colors = self._colors
+			bg = self._background
+
+			for i in range(3 * full, 3 * full + 3):
+				buf[base + i] = bg[i] + (colors[i] - bg[i]) * f
+
+class Pulse(Layer):
+	"""Modulates the brightness of whatever lies below it, dipping by DEPTH
+	(0 to 1) once every PERIOD seconds. With a SOURCE, the period shortens to
+	a quarter as its value goes from 0 to 1."""
+
+	animated = True
+
+	def __init__(self, period: float = 2.0, depth: float = 0.5, source: Optional[str] = None, start: int = 0, count: Optional[int] = None):
+		super().__init__(start, count)
+
+		if period <= 0:
+			raise ValueError("a pulse needs a positive period")
+
+		self.period = period
+		self.depth = depth
+		self.source = source
+		self._phase = 0.0
+		self._last: Optional[float] = None
+
+	def render(self, buf: array, signals: Signals, now: float):
+		period = self.period
+
+		if self.source is not None:
+			period /= 1 + 3 * min(max(signals[self.source], 0.0), 1.0)
+
+		# Advance the phase rather than deriving it from NOW, so a changing
+		#   period does not make the pulse jump.
+		if self._last is not None:
+			self._phase = (self._phase + (now - self._last) / period) % 1.0
+
+		self._last = now
+
+		factor = 1 - self.depth * (0.5 - 0.5 * cos(2 * pi * self._phase))
+
+		for i in range(3 * self.lo, 3 * self.hi):
+			buf[i] *= factor
+
+class Scene:
+	"""A stack of LAYERS, drawn bottom to top over a zone of LEDS LEDs."""
+
+	def __init__(self, leds: int, layers: Sequence[Layer]):
+		self.leds = leds
+		self.layers = list(layers)
+		self.buffer = array('d', bytes(8 * 3 * leds))
+		self._blank = array('d', bytes(8 * 3 * leds))
+
+		for layer in self.layers:
+			layer.bind(leds)
+
+	@property
+	def animated(self) -> bool:
+		return any(layer.animated for layer in self.layers)
+
+	def render(self, signals: Signals, now: float) -> array:
+		"""Draw the frame for time NOW into the buffer, and return it."""
+
+		self.buffer[:] = self._blank
+
+		for layer in self.layers:
+			layer.render(self.buffer, signals, now)
+
+		return self.buffer
+
+class Interpolator:
+	"""Smooths a sampled signal for rendering at a higher rate than it is
+	sampled. The value glides from the previous sample to the latest over one
+	sampling interval, trailing the samples by that interval."""
+
+	def __init__(self):
+		self._prev: Optional[float] = None
+		self._cur = 0.0
+		self._prev_time = 0.0
+		self._cur_time = 0.0
+
+	def update(self, value: float, now: float):
+		if self._prev is None:
+			self._prev, self._prev_time = value, now
+		else:
+			self._prev, self._prev_time = self.value(now), self._cur_time
+
+		self._cur, self._cur_time = value, now
+
+	def value(self, now: float) -> float:
+		if self._prev is None:
+			return self._cur
+
+		interval = self._cur_time - self._prev_time
+
+		if interval <= 0:
+			return self._cur
+
+		f = min((now - self._cur_time) / interval, 1.0)
+
+		return self._prev + (self._cur - self._prev) * f
+
+	def settled(self, now: float) -> bool:
+		"""Whether the value stays put from NOW until the next update."""
+
+		return self._prev is None or self._prev == self._cur or now - self._cur_time >= self._cur_time - self._prev_time
+
+def _rgb(c: Sequence[int]) -> RGB:
+	r, g, b = c
+	return r / 255, g / 255, b / 255
+
+def build_layers(spec: Sequence[Dict[str, Any]], lut) -> List[Layer]:
+	"""Create layers from their configuration (see config.py), using LUT for
+	every sensor-driven color."""
+
+	layers: List[Layer] = []
+
+	for l in spec:
+		span = {'start': l.get('start', 0), 'count': l.get('count')}
+		kind = l['type']
+
+		if kind == 'solid':
+			layers.append(Solid(_rgb(l['color']), **span))
+		elif kind == 'color':
+			layers.append(SensorColor(l['source'], lut, **span))
+		elif kind == 'gradient':
+			layers.append(Gradient(lut, l.get('lo', 0.0), l.get('hi', 1.0), **span))
+		elif kind == 'meter':
+			layers.append(Meter(l['source'], lut, _rgb(l.get('background', (0, 0, 0))), **span))
+		elif kind == 'pulse':
+			layers.append(Pulse(l.get('period', 2.0), l.get('depth', 0.5), l.get('source'), **span))
+		else:
+			raise ValueError(f"unknown layer type {kind!r}")
+
+	return layers
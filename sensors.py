@@ -0,0 +1,453 @@
+import os
+from time import monotonic
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple, Type
+
+from config import SensorConfig
+
+# Reading sensors.
+#
+# Each sensor has a type (see config.py) naming the source that reads it.
+# Sources are registered in SOURCES; Sensors creates one source per type in
+# use, and a sample is one read_all() pass over each of them, so that every
+# source can fetch all of its sensors in one go (one psutil call, one read
+# of a /proc file) rather than once per sensor.
+#
+# Temperatures come straight from hwmon by default. psutil.sensors_temperatures()
+# walks every chip under /sys/class/hwmon and reads every sensor file on each
+# call. The daemon only needs a couple of them, so HwmonReader finds the right
+# temp*_input files once, keeps them open and rereads them with a single
+# pread() each.
+
+HWMON_ROOT = '/sys/class/hwmon'
+PROC_ROOT = '/proc'
+
+SOURCES: Dict[str, Type['Source']] = {}
+
+def source(kind: str):
+	"""Register the decorated class as the source for sensors of type KIND."""
+
+	def register(cls):
+		SOURCES[kind] = cls
+		return cls
+
+	return register
+
+class Source:
+	"""Reads SENSORS, the sensors of one type by name."""
+
+	def __init__(self, sensors: Mapping[str, SensorConfig]):
+		self.sensors = dict(sensors)
+
+	def read_all(self) -> Dict[str, float]:
+		raise NotImplementedError
+
+	def close(self):
+		pass
+
+def _read_text(path: str) -> Optional[str]:
+	try:
+		with open(path) as f:
+			return f.read().strip()
+	except OSError:
+		return None
+
+def resolve(chip: str, label: str, root: str = HWMON_ROOT) -> str:
+	"""Find the temp*_input file of the sensor labelled LABEL on the hwmon
+	chip named CHIP, matching the chip and label names psutil reports.
+	Raises LookupError if there is none."""
+
+	try:
+		entries = sorted(os.listdir(root))
+	except OSError:
+		entries = []
+
+	for entry in entries:
+		base = os.path.join(root, entry)
+
+		# Some drivers put their attributes under device/.
+		for d in (base, os.path.join(base, 'device')):
+			if _read_text(os.path.join(d, 'name')) != chip:
+				continue
+
+			for f in sorted(os.listdir(d)):
+				if not (f.startswith('temp') and f.endswith('_input')):
+					continue
+
+				prefix = f[:-len('_input')]
+
+				if (_read_text(os.path.join(d, prefix + '_label')) or '') == label:
+					return os.path.join(d, f)
+
+	raise LookupError(f"no sensor labelled {label!r} on hwmon chip {chip!r}")
+
+@source('hwmon')
+class HwmonReader(Source):
+	"""Reads the sensors in SENSORS (by name) from hwmon, in °C.
+
+	Files are resolved and opened up front; if a read fails (say the driver
+	was reloaded and the hwmon numbering changed), that sensor is resolved
+	again and the read retried once."""
+
+	def __init__(self, sensors: Mapping[str, SensorConfig], root: str = HWMON_ROOT):
+		super().__init__(sensors)
+		self.root = root
+		self._fds: Dict[str, int] = {}
+
+		try:
+			for name in self.sensors:
+				self._open(name)
+		except BaseException:
+			self.close()
+			raise
+
+	def _open(self, name: str) -> int:
+		s = self.sensors[name]
+		fd = os.open(resolve(s.params['chip'], s.params['label'], self.root), os.O_RDONLY)
+		self._fds[name] = fd
+
+		return fd
+
+	def _reopen(self, name: str) -> int:
+		try:
+			os.close(self._fds.pop(name))
+		except (KeyError, OSError):
+			pass
+
+		return self._open(name)
+
+	def read_one(self, name: str) -> float:
+		try:
+			return int(os.pread(self._fds[name], 32, 0)) / 1000
+		except (OSError, ValueError, KeyError):
+			return int(os.pread(self._reopen(name), 32, 0)) / 1000
+
+	def read_all(self) -> Dict[str, float]:
+		return {name: self.read_one(name) for name in self.sensors}
+
+	def close(self):
+		for fd in self._fds.values():
+			try:
+				os.close(fd)
+			except OSError:
+				pass
+
+		self._fds.clear()
+
+@source('psutil')
+class PsutilTemperatures(Source):
+	"""Temperatures as psutil reports them (sensor LABEL of chip CHIP), for
+	systems where they do not come from hwmon. Every psutil sensor is read
+	once per pass."""
+
+	def __init__(self, sensors: Mapping[str, SensorConfig]):
+		import psutil
+
+		super().__init__(sensors)
+		self._psutil = psutil
+		self.read_all()
+
+	def read_all(self) -> Dict[str, float]:
+		temps = self._psutil.sensors_temperatures()
+		out = {}
+
+		for name, s in self.sensors.items():
+			chip, label = s.params['chip'], s.params['label']
+
+			try:
+				out[name] = next(t.current for t in temps[chip] if t.label == label)
+			except (KeyError, StopIteration):
+				raise LookupError(f"psutil has no sensor labelled {label!r} on chip {chip!r}") from None
+
+		return out
+
+@source('nvml')
+class NvmlTemperatures(Source):
+	"""NVIDIA GPU core temperatures through NVML, by device INDEX. NVML is the
+	pynvml module unless another object with the same interface (a stub, say)
+	is passed in."""
+
+	def __init__(self, sensors: Mapping[str, SensorConfig], nvml: Any = None):
+		if nvml is None:
+			import pynvml as nvml
+
+		super().__init__(sensors)
+		self._nvml = nvml
+		nvml.nvmlInit()
+
+		try:
+			self._handles = {name: nvml.nvmlDeviceGetHandleByIndex(s.params.get('index', 0)) for name, s in self.sensors.items()}
+		except BaseException:
+			nvml.nvmlShutdown()
+			raise
+
+	def read_all(self) -> Dict[str, float]:
+		nvml = self._nvml
+		return {name: float(nvml.nvmlDeviceGetTemperature(h, nvml.NVML_TEMPERATURE_GPU)) for name, h in self._handles.items()}
+
+	def close(self):
+		self._nvml.nvmlShutdown()
+
+class _Counters(Source):
+	# Rates of change of counters that are all read from one file. The
+	#   first pass, with nothing to compare against, reads 0.
+
+	def __init__(self, sensors: Mapping[str, SensorConfig], root: str = PROC_ROOT, clock: Callable[[], float] = monotonic):
+		super().__init__(sensors)
+		self.root = root
+		self.clock = clock
+		self._last: Optional[Tuple[float, Dict[str, float]]] = None
+		self.read_all()
+
+	def counters(self) -> Dict[str, float]:
+		"""The current value of each sensor's counter."""
+
+		raise NotImplementedError
+
+	def read_all(self) -> Dict[str, float]:
+		now = self.clock()
+		counters = self.counters()
+		last, self._last = self._last, (now, counters)
+
+		if last is None or now <= last[0]:
+			return {name: 0.0 for name in self.sensors}
+
+		dt = now - last[0]
+
+		return {name: max(counters[name] - last[1][name], 0.0) / dt for name in self.sensors}
+
+def _proc_lines(root: str, name: str) -> List[str]:
+	with open(os.path.join(root, name)) as f:
+		return f.read().splitlines()
+
+@source('cpu_load')
+class CpuLoad(Source):
+	"""How busy the CPU (or the core given as CPU, e.g. "cpu3") was since the
+	last pass, in percent, from /proc/stat."""
+
+	def __init__(self, sensors: Mapping[str, SensorConfig], root: str = PROC_ROOT):
+		super().__init__(sensors)
+		self.root = root
+		self._last: Dict[str, Tuple[int, int]] = {}
+		self.read_all()
+
+	def read_all(self) -> Dict[str, float]:
+		times = {}
+
+		for line in _proc_lines(self.root, 'stat'):
+			if not line.startswith('cpu'):
+				break
+
+			cpu, *fields = line.split()
+			values = [int(v) for v in fields]
+			# idle and iowait
+			idle = values[3] + (values[4] if len(values) > 4 else 0)
+			times[cpu] = (sum(values[:8]), idle)
+
+		out = {}
+
+		for name, s in self.sensors.items():
+			cpu = s.params.get('cpu', 'cpu')
+
+			if cpu not in times:
+				raise LookupError(f"no {cpu!r} in /proc/stat")
+
+			total, idle = times[cpu]
+			last_total, last_idle = self._last.get(cpu, (0, 0))
+			dt = total - last_total
+			out[name] = 100.0 * (dt - (idle - last_idle)) / dt if dt > 0 else 0.0
+
+		self._last = times
+
+		return out
+
+@source('memory')
+class MemoryUsage(Source):
+	"""How much memory is in use, in percent of the total, from
+	/proc/meminfo."""
+
+	def __init__(self, sensors: Mapping[str, SensorConfig], root: str = PROC_ROOT):
+		super().__init__(sensors)
+		self.root = root
+
+	def read_all(self) -> Dict[str, float]:
+		info = {}
+
+		for line in _proc_lines(self.root, 'meminfo'):
+			key, _, value = line.partition(':')
+			info[key] = int(value.split()[0])
+
+		used = 100.0 * (info['MemTotal'] - info['MemAvailable']) / info['MemTotal']
+
+		return {name: used for name in self.sensors}
+
+_DIRECTIONS = {
+	'disk': ('read', 'write', 'both'),
+	'net': ('rx', 'tx', 'both'),
+}
+
+def _direction(kind: str, s: SensorConfig) -> int:
+	direction = s.params.get('direction', 'both')
+
+	if direction not in _DIRECTIONS[kind]:
+		raise ValueError(f"{kind} direction must be one of {', '.join(_DIRECTIONS[kind])}")
+
+	return _DIRECTIONS[kind].index(direction)
+
+@source('disk')
+class DiskThroughput(_Counters):
+	"""Data read from and/or (DIRECTION "read", "write" or "both") written to
+	block device DEVICE (e.g. "nvme0n1"), in MB/s, from /proc/diskstats."""
+
+	def counters(self) -> Dict[str, float]:
+		sectors = {}
+
+		for line in _proc_lines(self.root, 'diskstats'):
+			fields = line.split()
+			sectors[fields[2]] = (int(fields[5]), int(fields[9]))
+
+		out = {}
+
+		for name, s in self.sensors.items():
+			device = s.params['device']
+
+			if device not in sectors:
+				raise LookupError(f"no block device {device!r} in /proc/diskstats")
+
+			read, written = sectors[device]
+			# Sectors are always 512 bytes here.
+			out[name] = (read, written, read + written)[_direction('disk', s)] * 512 / 1e6
+
+		return out
+
+@source('net')
+class NetThroughput(_Counters):
+	"""Data received and/or (DIRECTION "rx", "tx" or "both") sent on network
+	interface INTERFACE, in MB/s, from /proc/net/dev."""
+
+	def counters(self) -> Dict[str, float]:
+		octets = {}
+
+		for line in _proc_lines(self.root, 'net/dev')[2:]:
+			iface, _, fields = line.partition(':')
+			values = fields.split()
+			octets[iface.strip()] = (int(values[0]), int(values[8]))
+
+		out = {}
+
+		for name, s in self.sensors.items():
+			iface = s.params['interface']
+
+			if iface not in octets:
+				raise LookupError(f"no network interface {iface!r} in /proc/net/dev")
+
+			rx, tx = octets[iface]
+			out[name] = (rx, tx, rx + tx)[_direction('net', s)] / 1e6
+
+		return out
+
+class Sensors:
+	"""Reads every sensor in SENSORS through the source for its type.
+	OPTIONS gives extra arguments for the sources by type, e.g.
+	hwmon={'root': ...}.
+
+	A source that fails to read (a disk or network interface went away, a
+	driver was unloaded) does not stop the others: its sensors keep their
+	last readings until it recovers, and the failure is reported once. After
+	each pass, .recovered names the sensors whose source came back in it."""
+
+	def __init__(self, sensors: Mapping[str, SensorConfig], **options: Dict[str, Any]):
+		by_type: Dict[str, Dict[str, SensorConfig]] = {}
+
+		for name, s in sensors.items():
+			by_type.setdefault(s.type, {})[name] = s
+
+		self.sources: List[Source] = []
+		self.recovered: List[str] = []
+		self._last: List[Dict[str, float]] = []
+		self._failing: List[bool] = []
+
+		try:
+			for kind, group in by_type.items():
+				self.sources.append(SOURCES[kind](group, **options.get(kind, {})))
+				self._last.append({})
+				self._failing.append(False)
+		except BaseException:
+			self.close()
+			raise
+
+	def read_all(self) -> Dict[str, float]:
+		"""The current value of every sensor, by name."""
+
+		out: Dict[str, float] = {}
+		self.recovered = []
+
+		for i, s in enumerate(self.sources):
+			try:
+				self._last[i] = s.read_all()
+			except Exception as e:
+				if not self._failing[i]:
+					print(f"reading {', '.join(s.sensors)} failed, keeping the last readings: {str(e) or type(e).__name__}")
+					self._failing[i] = True
+			else:
+				if self._failing[i]:
+					print(f"reading {', '.join(s.sensors)} works again")
+					self._failing[i] = False
+					self.recovered.extend(s.sensors)
+
+			out.update(self._last[i])
+
+		return out
+
+	def close(self):
+		for s in self.sources:
+			s.close()
+
+class AdaptiveInterval:
+	"""Chooses how long to wait before the next sample: MIN_INTERVAL while
+	any reading changes faster than FAST_RATE per second, otherwise backing
+	off by half again per sample up to MAX_INTERVAL.
+
+	Rates are in the readings' own units unless SENSORS (SensorConfig by
+	name) is given, in which case each reading's rate is taken as a fraction
+	of its sensor's max - min per second, and compared against the sensor's
+	own fast_rate if it has one. That way a sensor in MB/s or % is not held
+	to the same absolute rate as one in °C."""
+
+	BACKOFF = 1.5
+
+	def __init__(self, min_interval: float, max_interval: float, fast_rate: float, sensors: Optional[Mapping[str, SensorConfig]] = None):
+		self.min_interval = min_interval
+		self.max_interval = max_interval
+		self.fast_rate = fast_rate
+		self.interval = min_interval
+
+		# The rate (in the sensor's unit per second) above which each
+		#   reading counts as moving fast.
+		self._fast: Dict[str, float] = {
+			name: (s.fast_rate or fast_rate) * (s.max - s.min)
+			for name, s in (sensors or {}).items()
+		}
+
+		self._last: Optional[Mapping[str, float]] = None
+		self._last_time = 0.0
+
+	def update(self, readings: Mapping[str, float], now: float) -> float:
+		"""Take the READINGS sampled at NOW into account and return the
+		interval until the next sample."""
+
+		last = self._last
+		dt = now - self._last_time
+
+		if last is not None and dt > 0:
+			fast = self._fast
+			default = self.fast_rate
+
+			if any(abs(v - last[k]) > fast.get(k, default) * dt for k, v in readings.items() if k in last):
+				self.interval = self.min_interval
+			else:
+				self.interval = min(self.interval * self.BACKOFF, self.max_interval)
+
+		self._last = dict(readings)
+		self._last_time = now
+
+		return self.interval
@@ -1,134 +1,305 @@
 #!/usr/bin/env python3
-from openrgb import OpenRGBClient
-from openrgb.utils import RGBColor, DeviceType
-from time import sleep
-import psutil
-from typing import Tuple
-import color
-
-def initRGB():
+from time import perf_counter
+_START = perf_counter()
+
+import asyncio
+from contextlib import contextmanager
+from functools import lru_cache
+import os
+from typing import TYPE_CHECKING, Dict
+import config
+import filters
+import lut
+import metrics
+import render
+import sensors
+
+if TYPE_CHECKING:
+	import connection
+	import devices
+
+# Importing this module has no side effects; main() loads the configuration,
+#   connects and runs the daemon. The OpenRGB client and everything built on
+#   it are only imported there, so tools that just want colors, through
+#   blackbody_lut(), do not pay for them. How long each startup stage took is
+#   exported as startup_seconds (see python -X importtime for a breakdown of
+#   imports).
+
+METRICS = metrics.Metrics()
+METRICS.describe('startup_seconds', 'gauge', "Time spent in each stage of startup.")
+METRICS.describe('sensor_read_seconds', 'histogram', "Time spent reading all sensors.")
+METRICS.describe('color_seconds', 'histogram', "Time spent rendering a frame.")
+METRICS.describe('sdk_write_seconds', 'histogram', "Time spent writing a frame to the devices.")
+METRICS.describe('frames_total', 'counter', "Frames rendered, by whether any zone was written.")
+METRICS.describe('zone_writes_total', 'counter', "Zone updates, by whether they were sent or skipped as unchanged.")
+METRICS.describe('reconnects_total', 'counter', "Reconnections to the SDK server.")
+METRICS.describe('sdk_errors_total', 'counter', "Failed frame writes, by error.")
+METRICS.describe('sensor_reading', 'gauge', "Latest filtered reading of each sensor, in its own unit.")
+METRICS.describe('sample_interval_seconds', 'gauge', "Current time between sensor samples.")
+
+# Set up by main().
+CONFIG: config.Config
+CONNECTIONS: 'connection.Connections'
+fanout: 'devices.Fanout'
+reader: sensors.Sensors
+smoothing: filters.SensorFilters
+
+# Seconds spent in each stage of startup, in order.
+STARTUP: Dict[str, float] = {}
+
+@contextmanager
+def startup_stage(name: str):
+	start = perf_counter()
+
+	try:
+		yield
+	finally:
+		STARTUP[name] = perf_counter() - start
+
+def connect_failed(e: OSError):
+	print(f"could not connect: {str(e) or type(e).__name__}")
+
+def initRGB() -> 'devices.Fanout':
 	# Getting this script ready to be run as a service. Waiting for the sdk to start.
+	print("trying to connect")
+	return CONNECTIONS.open(connect_failed)
+
+# Built on first use and, if PERSIST, kept on disk for the next start, one
+#   file per variant; set TEMPERATURE_LUT_CACHE to a directory to keep them
+#   somewhere else, or to "off" to never touch the disk. lookup(t) on the
+#   result gives the color of normalized temperature t as an 8-bit (r, g, b)
+#   tuple, without importing openrgb.
+@lru_cache(maxsize=None)
+def blackbody_lut(gamma_correct: bool = False, quadrature: str = 'table', persist: bool = True) -> lut.GradientLUT:
+	fn = lut.blackbody_rgb._replace(gamma_correct=gamma_correct, quadrature=quadrature)
+	cache_dir = os.environ.get('TEMPERATURE_LUT_CACHE')
+
+	if not persist or cache_dir == 'off':
+		return lut.GradientLUT(fn)
+
+	name = lut.cache_name('blackbody', fn)
+
+	return lut.GradientLUT.load_or_build(fn, os.path.join(cache_dir, name + '.lut') if cache_dir else lut.default_cache_path(name))
+
+def blackbody_temp(t, gamma_correct: bool = False):
+	# The same as blackbody_lut(gamma_correct).lookup(t), as an openrgb
+	#   RGBColor; importing openrgb brings in its whole client.
+	from openrgb.utils import RGBColor
+
+	return RGBColor(*blackbody_lut(gamma_correct).lookup(t))
+
+# Each stage runs as its own task so that a stalled SDK server only delays
+#   writes, never the next sensor sample. Stages hand over through one-slot
+#   queues holding just the newest value; a slow consumer skips stale ones.
+#   Sampling speeds up while temperatures move and backs off while they are
+#   steady. Frames are scheduled at CONFIG.fps, independently of the sampling
+#   rate, so animations stay smooth and readings glide between samples; once
+#   nothing moves, rendering waits for the next sample.
+SAMPLE_TIMEOUT = 1.0
+WRITE_TIMEOUT = 2.0
+
+# Even a frame that did not change is handed to the writers this often (or
+#   every CONFIG.refresh seconds, if sooner), so that their periodic refresh
+#   (see output.ZoneWriter) still gets a chance to put back colors a device
+#   drifted from.
+FRAME_REFRESH = 10.0
+
+def put_latest(queue: asyncio.Queue, item):
+	"""Queue ITEM, replacing anything the consumer has not picked up yet."""
+
+	if queue.full():
+		queue.get_nowait()
+
+	queue.put_nowait(item)
+
+def read_temps(gap: bool = False) -> Dict[str, float]:
+	# After a GAP in the samples, or for sensors that just came back, the
+	#   filters' history says nothing about the new readings.
+	if gap:
+		smoothing.reset()
+
+	with METRICS.time('sensor_read_seconds'):
+		readings = reader.read_all()
+
+	smoothing.reset(reader.recovered)
+
+	return smoothing.apply(readings)
+
+async def sample(temps: asyncio.Queue):
+	loop = asyncio.get_running_loop()
+	pacing = sensors.AdaptiveInterval(*CONFIG.sampling, CONFIG.sensors)
+	deadline = loop.time()
+	gap = False
+
 	while True:
 		try:
-			print("trying to connect")
-			cli = OpenRGBClient()
-			break
-		except ConnectionRefusedError:
-			sleep(5)
+			readings = await asyncio.wait_for(asyncio.to_thread(read_temps, gap), SAMPLE_TIMEOUT)
+			put_latest(temps, readings)
+			interval = pacing.update(readings, loop.time())
+			gap = False
+		except asyncio.TimeoutError:
+			print("reading sensors timed out")
+			interval = pacing.interval
+			gap = True
+
+		METRICS.set('sample_interval_seconds', interval)
+		deadline = max(deadline + interval, loop.time())
+		await asyncio.sleep(deadline - loop.time())
+
+def normalize(name: str, temp: float) -> float:
+	sensor = CONFIG.sensors[name]
+	return (temp - sensor.min) / (sensor.max - sensor.min)
+
+async def animate(temps: asyncio.Queue, frames: asyncio.Queue):
+	loop = asyncio.get_running_loop()
+	frame_interval = 1 / CONFIG.fps
+	smooth = {name: render.Interpolator() for name in CONFIG.sensors}
+	refresh = min(FRAME_REFRESH, CONFIG.refresh or FRAME_REFRESH)
+	last = None
+	queued = 0.0
+
+	# Nothing to draw until the first sample is in.
+	readings = await temps.get()
+	deadline = loop.time()
+
+	while True:
+		if readings is not None:
+			for name, temp in readings.items():
+				smooth[name].update(normalize(name, temp), deadline)
+				METRICS.set('sensor_reading', temp, sensor=name)
+
+		signals = {name: s.value(deadline) for name, s in smooth.items()}
+		still = not fanout.animated
+
+		if signals != last or not still or deadline - queued >= refresh:
+			put_latest(frames, (signals, deadline))
+			last = signals
+			queued = deadline
+
+		if still and all(s.settled(deadline) for s in smooth.values()):
+			# The frame cannot change before the next sample, or the next
+			#   refresh if sampling stalls.
+			try:
+				readings = await asyncio.wait_for(temps.get(), max(queued + refresh - loop.time(), 0))
+			except asyncio.TimeoutError:
+				readings = None
+
+			deadline = loop.time()
 			continue
 
-	mb = cli.get_devices_by_type(DeviceType.MOTHERBOARD)[0]
-	# try:
-	#     gpu = cli.get_devices_by_type(DeviceType.GPU)[0]
-	# except IndexError:
-	#     gpu = False
-	# right_ram, left_ram = cli.get_devices_by_type(DeviceType.DRAM)
-
-	# right_ram.clear()
-	# left_ram.clear()
-
-
-	# To make sure the devices are in the right mode, and to work around a problem
-	#   where the gpu won't change colors until switched out of static mode and
-	#   then back into static mode.
-	if mb:
-		mb.set_mode(0)  # Direct mode
-	# if gpu:
-	#     gpu.set_mode(1)  # Anything would work, this is breathing in my setup
-	#     sleep(.1)
-	#     gpu.set_mode(0)  # Static mode.  My GPU doesn't have a direct mode.
-	#     try:
-	#         nvmlInit()
-	#         handle = nvmlDeviceGetHandleByIndex(0)
-	#     except:
-	#         gpu, handle = False, False
-	# else:
-	# 	handle = False
-	return mb
-
-# def temp_to_color(temp: int, min: int, max: int) -> Tuple[int, int]:
-# 	multiplier = 240/(max - min)
-# 	if temp < min:
-# 		return 0, 255
-# 	elif temp < max:
-# 		return int((temp - min) * multiplier), int((max - temp) * multiplier)
-# 	elif temp >= max:
-# 		return 255, 0
-
-def blackbody_temp(t):
-	T = 1000 + t * 8000
-	tscale = .75 + t / 4
-
-	x, y, z = color.spectrum_to_xyz(color.bb_spectrum(T))
-	r, g, b = color.xyz_to_rgb(color.SMPTE_SYSTEM, x, y, z)
-	r, g, b = color.constrain_rgb(r, g, b)
-	r, g, b = color.norm_rgb(r, g, b)
-	r, g, b = r * tscale, g * tscale, b * tscale
-
-	return RGBColor(int(r*255), int(g*255), int(b*255))
-
-mb = initRGB()
-BLACK = RGBColor(0, 0, 0)
-
-# for temp in range(30 * 8, 100 * 8):
-# 	cpu_temp = temp / 8
-# 	gpu_temp = 100 - (temp / 8 - 30)
-
-# 	cpu_color = blackbody_temp((cpu_temp - 30) / 70)
-# 	gpu_color = blackbody_temp((gpu_temp - 30) / 70)
-
-# 	mb.zones[1].set_colors([cpu_color] * 2 + [BLACK] + [gpu_color] * 2 + [BLACK])
-
-# 	print(cpu_temp, gpu_temp)
-
-# raise SystemExit()
-
-while True:
-	try:
-		if mb:
-			temps = psutil.sensors_temperatures()
-			### CPU Temp
-			cpu_temp = [t.current for t in temps['zenpower'] if t.label == 'Tdie'][0]
-			gpu_temp = [t.current for t in temps['amdgpu'] if t.label == 'edge'][0]
-
-			cpu_color = blackbody_temp((cpu_temp - 30) / 70)
-			gpu_color = blackbody_temp((gpu_temp - 30) / 70)
-
-			mb.zones[1].set_colors([cpu_color] * 2 + [BLACK] + [gpu_color] * 2 + [BLACK])
-
-			print(cpu_temp, gpu_temp)
-
-			# red, blue = temp_to_color(temp, 45, 75)
-			# cooler.set_color(RGBColor(red, 0, blue))
-
-		# if gpu:
-		#     ### GPU Temp
-		#     temp = nvmlDeviceGetTemperature(handle, NVML_TEMPERATURE_GPU)
-		#     red, blue = temp_to_color(temp, 35, 65)
-		#     gpu.set_color(RGBColor(red, 0, blue))
-		sleep(.25)
-		### RAM Usage
-		### Works fine
-		# usage = psutil.virtual_memory().percent
-		# if usage < 20:
-		#     right_ram.set_color(RGBColor(0, 0, 0), end=4)
-		#     right_ram.leds[4].set_color(RGBColor(0, 0, int(usage*10)))
-		# elif usage < 40:
-		#     right_ram.set_color(RGBColor(0, 0, 0), end=3)
-		#     right_ram.leds[3].set_color(RGBColor(0, 0, int((usage - 20)*10)))
-		#     right_ram.leds[4].set_color(RGBColor(0, 0, 255))
-		# elif usage < 60:
-		#     right_ram.set_color(RGBColor(0, 0, 0), end=2)
-		#     right_ram.leds[2].set_color(RGBColor(0, 0, int((usage - 40)*10)))
-		#     right_ram.set_color(RGBColor(0, 0, 255), start=3)
-		# elif usage < 80:
-		#     right_ram.set_color(RGBColor(0, 0, 255), start=2)
-		#     right_ram.leds[0].set_color(RGBColor(0, 0, 0))
-		#     right_ram.leds[1].set_color(RGBColor(0, 0, int((usage - 60)*10)))
-		# else:
-		#     right_ram.set_color(RGBColor(0, 0, 255), start=1)
-		#     right_ram.leds[0].set_color(RGBColor(0, 0, int((usage - 80)*10)))
-	except (ConnectionResetError, BrokenPipeError, TimeoutError) as e:
-		print(str(e) + " during main loop")
-		print("Trying to reconnect...")
-		mb = initRGB()
+		deadline = max(deadline + frame_interval, loop.time())
+		await asyncio.sleep(deadline - loop.time())
+
+		readings = None if temps.empty() else temps.get_nowait()
+
+def write_frame(target: 'devices.Fanout', signals: render.Signals, now: float):
+	with METRICS.time('color_seconds'):
+		target.render(signals, now)
+
+	with METRICS.time('sdk_write_seconds'):
+		sent = target.write()
+
+	METRICS.inc('frames_total', result='sent' if sent else 'skipped')
+	METRICS.inc('zone_writes_total', sent, result='sent')
+	METRICS.inc('zone_writes_total', len(target.targets) - sent, result='skipped')
+
+def close_when_done(job: asyncio.Future, stale: 'devices.Fanout'):
+	"""Close STALE once JOB, a write still using it, has given up."""
+
+	def close(_):
+		if not job.cancelled():
+			# Retrieved so that it is not reported as unhandled.
+			job.exception()
+
+		stale.close()
+
+	job.add_done_callback(close)
+
+async def write(frames: asyncio.Queue):
+	global fanout
+
+	while True:
+		signals, now = await frames.get()
+		job = asyncio.ensure_future(asyncio.to_thread(write_frame, fanout, signals, now))
+
+		try:
+			await asyncio.wait_for(asyncio.shield(job), WRITE_TIMEOUT)
+		except (ConnectionError, TimeoutError, asyncio.TimeoutError) as e:
+			METRICS.inc('sdk_errors_total', error=type(e).__name__)
+			print((str(e) or type(e).__name__) + " during main loop")
+			print("Trying to reconnect...")
+
+			if job.done():
+				fanout = await asyncio.to_thread(CONNECTIONS.recover, connect_failed)
+			else:
+				# The timed-out write is still stuck on its connections, and
+				#   would break them again whenever it fails; leave them to it
+				#   until then, and carry on over new ones.
+				close_when_done(job, fanout)
+				fanout = await asyncio.to_thread(CONNECTIONS.open, connect_failed)
+
+			METRICS.inc('reconnects_total')
+
+			# Frames only come when something changes, so send the one that
+			#   failed again rather than wait for the next.
+			if frames.empty():
+				put_latest(frames, (signals, now))
+
+async def run():
+	temps = asyncio.Queue(maxsize=1)
+	frames = asyncio.Queue(maxsize=1)
+
+	await asyncio.gather(
+		sample(temps),
+		animate(temps, frames),
+		write(frames),
+	)
+
+def main():
+	global CONFIG, CONNECTIONS, fanout, reader, smoothing
+
+	STARTUP['imports'] = perf_counter() - _START
+
+	with startup_stage('config'):
+		try:
+			CONFIG = config.load(os.environ.get('TEMPERATURE_CONFIG'))
+		except (OSError, ValueError) as e:
+			raise SystemExit(f"could not load the configuration: {e}") from None
+
+	# Set TEMPERATURE_METRICS to HOST:PORT to serve these over HTTP, or to a
+	#   path (optionally prefixed with unix:) for a Unix socket.
+	if os.environ.get('TEMPERATURE_METRICS'):
+		metrics.serve(METRICS, os.environ['TEMPERATURE_METRICS'])
+
+	with startup_stage('lut'):
+		gradient = blackbody_lut(CONFIG.gamma_correct, CONFIG.quadrature)
+
+	with startup_stage('sensors'):
+		try:
+			reader = sensors.Sensors(CONFIG.sensors)
+		except Exception as e:
+			hint = "" if os.environ.get('TEMPERATURE_CONFIG') else (
+				"\nThe built-in configuration is for a zenpower CPU and an amdgpu GPU; "
+				"set TEMPERATURE_CONFIG to a configuration file for this machine's sensors (see config.py).")
+
+			raise SystemExit(f"could not set up the sensors: {str(e) or type(e).__name__}{hint}") from None
+
+		smoothing = filters.SensorFilters(CONFIG.sensors)
+
+	with startup_stage('client_imports'):
+		import connection
+
+	CONNECTIONS = connection.Connections(CONFIG, gradient)
+
+	with startup_stage('connect'):
+		fanout = initRGB()
+
+	for stage, seconds in STARTUP.items():
+		METRICS.set('startup_seconds', seconds, stage=stage)
+
+	print("started in {:.3f}s ({})".format(sum(STARTUP.values()), ', '.join(f'{k} {v:.3f}s' for k, v in STARTUP.items())))
+
+	asyncio.run(run())
+
+if __name__ == '__main__':
+	main()
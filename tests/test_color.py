@@ -0,0 +1,121 @@
+from math import exp
+import unittest
+
+import color
+import lut
+
+class GammaTest(unittest.TestCase):
+	def test_rec709(self):
+		cs = color.SMPTE_SYSTEM
+
+		self.assertAlmostEqual(color.gamma_correct(cs, 0.5), 1.099 * 0.5 ** 0.45 - 0.099)
+		self.assertAlmostEqual(color.gamma_correct(cs, 1.0), 1.0)
+		self.assertEqual(color.gamma_correct(cs, 0.0), 0.0)
+
+		# Linear below the cutoff, meeting the curve there (a slope of about 4.5).
+		slope = (1.099 * 0.018 ** 0.45 - 0.099) / 0.018
+		self.assertAlmostEqual(color.gamma_correct(cs, 0.01), 0.01 * slope)
+		self.assertAlmostEqual(slope, 4.5, places=1)
+		self.assertAlmostEqual(color.gamma_correct(cs, 0.018 - 1e-12), color.gamma_correct(cs, 0.018))
+
+	def test_power_law(self):
+		cs = color.SMPTE_SYSTEM._replace(gamma=2.2)
+
+		self.assertAlmostEqual(color.gamma_correct(cs, 0.25), 0.25 ** (1 / 2.2))
+
+	def test_rgb(self):
+		cs = color.REC709_SYSTEM
+
+		self.assertEqual(color.gamma_correct_rgb(cs, 0.0, 0.5, 1.0), tuple(color.gamma_correct(cs, c) for c in (0.0, 0.5, 1.0)))
+
+	def test_blackbody(self):
+		linear = lut.blackbody_rgb
+		corrected = linear._replace(gamma_correct=True)
+
+		for t in (0.0, 0.4, 1.0):
+			self.assertEqual(corrected(t), color.gamma_correct_rgb(linear.cs, *linear(t)))
+
+class PlanckianTest(unittest.TestCase):
+	def test_close_to_the_integral(self):
+		for t in range(1000, 9001, 250):
+			with self.subTest(t=t):
+				x, y, _ = color.spectrum_to_xyz(color.bb_spectrum(t))
+				fx, fy = color.planckian_xy(t)
+
+				self.assertLess(max(abs(fx - x), abs(fy - y)), 6e-4)
+
+def planck(wavelength: float, bb_temp: float) -> float:
+	wlm = wavelength * 1e-9
+	return 3.74183e-16 * wlm ** -5.0 / (exp(1.4388e-2 / (wlm * bb_temp)) - 1.0)
+
+class PlanckKernelTest(unittest.TestCase):
+	def test_matches_planck(self):
+		kernel = color.PlanckKernel((400, 550, 700))
+
+		for t in (1000, 3500.5, 9000):
+			with self.subTest(t=t):
+				for value, wl in zip(kernel(t), kernel.wavelengths):
+					self.assertAlmostEqual(value / planck(wl, t), 1.0, places=12)
+
+	def test_spectrum_off_the_grid(self):
+		spectrum = color.PlanckKernel((400, 550)).spectrum(3000)
+
+		self.assertEqual(spectrum(550), color.PlanckKernel((550,))(3000)[0])
+		self.assertAlmostEqual(spectrum(551.5) / planck(551.5, 3000), 1.0, places=12)
+
+	def test_quantum(self):
+		kernel = color.PlanckKernel((400, 550), quantum=10)
+
+		self.assertEqual(kernel(3004), kernel(3000))
+		self.assertEqual(kernel(2996), kernel(3000))
+		self.assertNotEqual(kernel(3006), kernel(3000))
+		self.assertEqual(kernel._emittance.cache_info().currsize, 2)
+
+	def test_cache_size(self):
+		kernel = color.PlanckKernel((400, 550), cache_size=2)
+
+		for t in (1000, 2000, 1000, 3000, 4000):
+			kernel(t)
+
+		info = kernel._emittance.cache_info()
+		self.assertEqual((info.hits, info.misses, info.currsize), (1, 4, 2))
+
+try:
+	import numpy as np
+	import color_array
+except ImportError:
+	np = None
+
+@unittest.skipIf(np is None, "needs NumPy")
+class GammaArrayTest(unittest.TestCase):
+	def test_matches_scalar(self):
+		values = np.linspace(0, 1, 101)
+
+		for cs in (color.SMPTE_SYSTEM, color.SMPTE_SYSTEM._replace(gamma=2.2)):
+			with self.subTest(gamma=cs.gamma):
+				expected = [color.gamma_correct(cs, v) for v in values]
+				np.testing.assert_allclose(color_array.gamma_correct(cs, values), expected, atol=1e-12)
+
+				out = values.copy()
+				color_array.gamma_correct(cs, out, out=out)
+				np.testing.assert_allclose(out, expected, atol=1e-12)
+
+	def test_lut(self):
+		cs = color.SMPTE_SYSTEM
+		table = color_array.GammaLUT(cs)
+		values = np.array([-0.5, 0.0, 0.01, 0.25, 0.5, 1.0, 2.0])
+		expected = [round(color.gamma_correct(cs, min(max(v, 0), 1)) * 255) for v in values]
+
+		codes = table(values)
+
+		self.assertEqual(codes.dtype, np.uint8)
+		np.testing.assert_allclose(codes, expected, atol=1)
+		self.assertEqual((codes[0], codes[-1]), (0, 255))
+
+	def test_planckian_matches_scalar(self):
+		temps = np.array([1000.0, 1500.0, 1666.0, 1667.0, 2221.0, 2222.0, 3999.0, 4000.0, 6500.0, 25000.0])
+
+		np.testing.assert_allclose(color_array.planckian_xy(temps), [color.planckian_xy(t) for t in temps], rtol=0, atol=1e-12)
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,121 @@
+import unittest
+
+import color
+
+try:
+	import numpy as np
+	import color_array
+except ImportError:
+	np = None
+
+TEMPS = (1000.0, 1850.5, 3000.0, 6500.0, 12000.0)
+
+@unittest.skipIf(np is None, "needs NumPy")
+class BlackbodyTest(unittest.TestCase):
+	def test_matches_scalar(self):
+		expected = [color.spectrum_to_xyz(color.bb_spectrum(t)) for t in TEMPS]
+
+		xyz = color_array.bb_to_xyz(np.array(TEMPS))
+
+		self.assertEqual(xyz.shape, (len(TEMPS), 3))
+		np.testing.assert_allclose(xyz, expected, rtol=1e-12)
+		np.testing.assert_allclose(xyz.sum(axis=1), 1.0)
+
+	def test_single_temperature(self):
+		xyz = color_array.bb_temp_to_xyz(3000.0)
+
+		self.assertIsInstance(xyz[0], float)
+		np.testing.assert_allclose(xyz, color.spectrum_to_xyz(color.bb_spectrum(3000.0)), rtol=1e-12)
+
+	def test_spectra(self):
+		spectra = color_array.bb_spectra(np.array(TEMPS))
+
+		self.assertEqual(spectra.shape, (len(TEMPS), len(color_array.WAVELENGTHS)))
+		np.testing.assert_allclose(spectra[1], color.PLANCK(TEMPS[1]), rtol=1e-12)
+
+@unittest.skipIf(np is None, "needs NumPy")
+class SPDTest(unittest.TestCase):
+	def test_blackbody(self):
+		spd = color_array.SPD.blackbody(3000.0)
+
+		np.testing.assert_allclose(spd.to_xyz(), color.spectrum_to_xyz(color.bb_spectrum(3000.0)), rtol=1e-12)
+
+		# Called as a spectrum function, it gives the same as its values.
+		np.testing.assert_allclose(color.spectrum_to_xyz(spd), spd.to_xyz(), rtol=1e-12)
+
+	def test_resample(self):
+		# Every other grid wavelength, and a straight line between them.
+		wavelengths = np.arange(400, 701, 10)
+		spd = color_array.SPD.resample(wavelengths, wavelengths - 300.0)
+
+		self.assertEqual(spd(395), 0.0)
+		self.assertEqual(spd(400), 100.0)
+		self.assertEqual(spd(405), 105.0)
+		self.assertEqual(spd(700), 400.0)
+		self.assertEqual(spd(705), 0.0)
+
+	def test_resample_rejects(self):
+		with self.assertRaises(ValueError):
+			color_array.SPD.resample([400, 500], [1.0])
+
+		with self.assertRaises(ValueError):
+			color_array.SPD.resample([500, 400], [1.0, 2.0])
+
+		with self.assertRaises(ValueError):
+			color_array.SPD(np.ones(80))
+
+	def test_batch(self):
+		spds = [color_array.SPD.blackbody(t) for t in TEMPS]
+		expected = [spd.to_xyz() for spd in spds]
+
+		np.testing.assert_allclose(color_array.spds_to_xyz(spds), expected, rtol=1e-12)
+		np.testing.assert_allclose(color_array.spds_to_xyz(np.stack([spd.values for spd in spds])), expected, rtol=1e-12)
+		self.assertEqual(color_array.spds_to_xyz([]).shape, (0, 3))
+
+@unittest.skipIf(np is None, "needs NumPy")
+class ConversionTest(unittest.TestCase):
+	def setUp(self):
+		self.cs = color.SMPTE_SYSTEM
+		self.xyz = color_array.bb_to_xyz(np.array(TEMPS))
+
+	def assertRowsEqual(self, actual, fn, rows):
+		np.testing.assert_allclose(actual, [fn(*row) for row in rows], rtol=1e-12, atol=1e-15)
+
+	def test_chromaticity(self):
+		xy = self.xyz[:, :2]
+		upvp = color_array.xy_to_upvp(xy)
+
+		self.assertRowsEqual(upvp, color.xy_to_upvp, xy)
+		self.assertRowsEqual(color_array.upvp_to_xy(upvp), color.upvp_to_xy, upvp)
+
+	def test_rgb(self):
+		rgb = color_array.xyz_to_rgb(self.cs, self.xyz)
+
+		self.assertRowsEqual(rgb, lambda *xyz: color.xyz_to_rgb(self.cs, *xyz), self.xyz)
+
+		# The coolest black bodies are too red for the gamut.
+		np.testing.assert_array_equal(color_array.inside_gamut(rgb), [color.inside_gamut(*row) for row in rgb])
+		self.assertFalse(color_array.inside_gamut(rgb).all())
+
+		self.assertRowsEqual(color_array.constrain_rgb(rgb), color.constrain_rgb, rgb)
+		self.assertRowsEqual(color_array.norm_rgb(rgb), color.norm_rgb, rgb)
+
+	def test_norm_leaves_black(self):
+		np.testing.assert_array_equal(color_array.norm_rgb(np.array([[0.0, 0.0, 0.0], [-1.0, -2.0, 0.0]])), [[0.0, 0.0, 0.0], [-1.0, -2.0, 0.0]])
+
+	def test_in_place(self):
+		expected = color_array.norm_rgb(color_array.constrain_rgb(color_array.xyz_to_rgb(self.cs, self.xyz)))
+
+		buf = self.xyz.copy()
+		rgb = color_array.xyz_to_rgb(self.cs, buf, out=buf)
+		color_array.norm_rgb(color_array.constrain_rgb(rgb, out=rgb), out=rgb)
+
+		self.assertIs(rgb, buf)
+		np.testing.assert_array_equal(buf, expected)
+
+		xy = self.xyz[:, :2].copy()
+		color_array.upvp_to_xy(color_array.xy_to_upvp(xy, out=xy), out=xy)
+		np.testing.assert_allclose(xy, self.xyz[:, :2], rtol=1e-12)
+
+if __name__ == '__main__':
+	unittest.main()
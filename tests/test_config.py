@@ -0,0 +1,116 @@
+import unittest
+
+import config
+
+SENSORS = {'cpu': {'chip': 'zenpower', 'label': 'Tdie'}}
+
+def with_layers(*layers):
+	return {'sensors': SENSORS, 'zones': [{'layers': list(layers)}]}
+
+class ParseTest(unittest.TestCase):
+	def assertRejects(self, raw, message):
+		with self.assertRaisesRegex(ValueError, message):
+			config.parse(raw)
+
+	def test_default(self):
+		cfg = config.load()
+
+		self.assertEqual(set(cfg.sensors), {'cpu', 'gpu'})
+		self.assertEqual(cfg.sensors['cpu'].params, {'chip': 'zenpower', 'label': 'Tdie'})
+		self.assertEqual(cfg.zones[0].layers, [
+			{'type': 'color', 'source': 'cpu', 'start': 0, 'count': 2},
+			{'type': 'color', 'source': 'gpu', 'start': 3, 'count': 2},
+		])
+		self.assertEqual(cfg.quadrature, 'table')
+
+	def test_sensors(self):
+		self.assertRejects({'sensors': {'x': {'type': 'lm75'}}}, "unknown type 'lm75'")
+		self.assertRejects({'sensors': {'x': {'chip': 'k10temp'}}}, "needs a label")
+		self.assertRejects({'sensors': {'x': {'type': 'memory', 'chip': 'k10temp'}}}, "unknown settings chip")
+		self.assertRejects({'sensors': {'x': {'type': 'net'}}}, "needs a interface")
+		self.assertRejects({'sensors': {'x': {'type': 'memory', 'min': 50, 'max': 50}}}, "max <= min")
+		self.assertRejects({'sensors': {'x': {'type': 'memory', 'fast_rate': 0}}}, "positive fast_rate")
+
+	def test_filters(self):
+		def sensor(*filters):
+			return {'sensors': {'x': {'type': 'memory', 'filters': list(filters)}}}
+
+		self.assertRejects(sensor({'type': 'kalman'}), "unknown type 'kalman'")
+		self.assertRejects(sensor({'type': 'median', 'size': 0}), "positive integer size")
+		self.assertRejects(sensor({'type': 'median', 'size': 2.5}), "positive integer size")
+		self.assertRejects(sensor({'type': 'median', 'size': True}), "positive integer size")
+		self.assertRejects(sensor({'type': 'ema', 'alpha': 0}), "alpha between 0 and 1")
+		self.assertRejects(sensor({'type': 'ema', 'alpha': 'x'}), "alpha between 0 and 1")
+		self.assertRejects(sensor({'type': 'hysteresis', 'band': '0.5'}), "non-negative band")
+		self.assertRejects(sensor({'type': 'hysteresis', 'band': -1}), "non-negative band")
+		self.assertRejects(sensor({'type': 'hysteresis', 'width': 1}), "unknown settings width")
+
+		cfg = config.parse(sensor({'type': 'ema', 'alpha': 1}, {'type': 'hysteresis', 'band': 0}))
+		self.assertEqual(cfg.sensors['x'].filters, [{'type': 'ema', 'alpha': 1}, {'type': 'hysteresis', 'band': 0}])
+
+	def test_zones(self):
+		self.assertRejects({'sensors': SENSORS, 'zones': [{}]}, "exactly one of")
+		self.assertRejects({'sensors': SENSORS, 'zones': [{'source': 'cpu', 'leds': ['cpu']}]}, "exactly one of")
+		self.assertRejects({'sensors': SENSORS, 'zones': [{'source': 'gpu'}]}, "unknown sensor 'gpu'")
+
+	def test_devices(self):
+		def zone(**z):
+			return {'sensors': SENSORS, 'zones': [dict(z, source='cpu')]}
+
+		self.assertRejects(zone(device_type='GPUU'), "unknown device_type 'GPUU'")
+		self.assertRejects(zone(device_type='gpu'), "unknown device_type 'gpu'")
+		self.assertRejects(zone(device_name=3), "string device_name")
+		self.assertRejects(zone(zone=-1), "zone index or name")
+		self.assertRejects(zone(zone=1.5), "zone index or name")
+		self.assertRejects(zone(mode=None), "mode index or name")
+		self.assertRejects(zone(mode=True), "mode index or name")
+
+		cfg = config.parse(zone(device_type='DRAM', zone='DRAM', mode='Static'))
+		self.assertEqual(cfg.zones[0][:3], ('DRAM', None, 'DRAM'))
+		self.assertEqual(cfg.zones[0].mode, 'Static')
+
+	def test_layers(self):
+		self.assertRejects(with_layers({'type': 'sparkle'}), "unknown type 'sparkle'")
+		self.assertRejects(with_layers({'type': 'solid'}), "needs a color")
+		self.assertRejects(with_layers({'type': 'solid', 'color': [300, 0, 0]}), "color of three components")
+		self.assertRejects(with_layers({'type': 'solid', 'color': [255, 0]}), "color of three components")
+		self.assertRejects(with_layers({'type': 'meter', 'source': 'cpu', 'background': [0, -1, 0]}), "background of three components")
+		self.assertRejects(with_layers({'type': 'solid', 'color': [0, 0, 0], 'start': -1}), "non-negative integer start")
+		self.assertRejects(with_layers({'type': 'pulse', 'period': 0}), "positive period")
+		self.assertRejects(with_layers({'type': 'pulse', 'depth': 1.5}), "depth between 0 and 1")
+		self.assertRejects(with_layers({'type': 'gradient', 'lo': 'cold'}), "number for lo")
+
+		config.parse(with_layers(
+			{'type': 'solid', 'color': [255, 0, 127.5], 'count': 3},
+			{'type': 'meter', 'source': 'cpu', 'background': [0, 0, 16]},
+			{'type': 'pulse', 'period': 0.5, 'depth': 1},
+		))
+
+	def test_rates(self):
+		self.assertRejects({'fps': 0}, "fps must be positive")
+		self.assertRejects({'sampling': {'min_interval': 2, 'max_interval': 1}}, "min_interval <= max_interval")
+		self.assertRejects({'sampling': {'min_interval': 0}}, "min_interval <= max_interval")
+		self.assertRejects({'sampling': {'fast_rate': -1}}, "positive fast_rate")
+
+	def test_writes(self):
+		self.assertRejects({'threshold': -1}, "threshold must be a non-negative number")
+		self.assertRejects({'threshold': '3'}, "threshold must be a non-negative number")
+		self.assertRejects({'refresh': 0}, "refresh must be a positive number")
+
+		cfg = config.parse({})
+		self.assertEqual((cfg.threshold, cfg.refresh), (3.0, 30.0))
+
+		cfg = config.parse({'threshold': 0, 'refresh': None})
+		self.assertEqual((cfg.threshold, cfg.refresh), (0.0, None))
+
+	def test_quadrature(self):
+		for name in ('reduced:3', 'analytic:0', 'table:4', 'planckian:2', 'simpson', 'reduced:x'):
+			with self.subTest(name=name):
+				self.assertRejects({'quadrature': name}, "unknown quadrature")
+
+		for name in ('table', 'reduced', 'reduced:4', 'analytic:1', 'planckian'):
+			with self.subTest(name=name):
+				self.assertEqual(config.parse({'quadrature': name}).quadrature, name)
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,93 @@
+import time
+import unittest
+
+import config
+import connection
+import fakeserver
+
+class BackoffTest(unittest.TestCase):
+	def test_doubles_up_to_the_cap(self):
+		backoff = connection.Backoff(0.1, 1.0, rand=lambda: 1.0)
+
+		self.assertEqual([backoff.next() for _ in range(6)], [0.1, 0.2, 0.4, 0.8, 1.0, 1.0])
+
+		backoff.reset()
+		self.assertEqual(backoff.next(), 0.1)
+
+	def test_jitter(self):
+		low = connection.Backoff(0.1, 1.0, rand=lambda: 0.0)
+		high = connection.Backoff(0.1, 1.0, rand=lambda: 1.0)
+
+		for _ in range(6):
+			a, b = low.next(), high.next()
+			self.assertAlmostEqual(a, b / 2)
+
+class ConnectionsTest(unittest.TestCase):
+	"""Reconnects to a fakeserver."""
+
+	def setUp(self):
+		self.cfg = config.parse({
+			'sensors': config.DEFAULT_CONFIG['sensors'],
+			'threshold': 0,
+			'zones': [{'device_type': 'DRAM', 'layers': [{'type': 'solid', 'color': [255, 0, 0]}]}],
+		})
+		self.server = self.start_server()
+
+		self.connections = connection.Connections(self.cfg, None, standby=False, backoff=connection.Backoff(0.01, 0.05), port=self.server.port, name='test')
+		self.addCleanup(self.connections.close)
+
+		self.errors = []
+
+	def start_server(self, port: int = 0) -> fakeserver.FakeServer:
+		server = fakeserver.FakeServer(port=port).start()
+		self.addCleanup(server.stop)
+
+		return server
+
+	def wait_for_writes(self, n: int):
+		deadline = time.monotonic() + 5
+
+		while self.server.stats['zone_writes'] < n:
+			if time.monotonic() > deadline:
+				self.fail(f"server saw {self.server.stats['zone_writes']} zone writes, expected {n}")
+
+			time.sleep(0.001)
+
+	def write(self, fanout) -> int:
+		fanout.render({}, 0.0)
+		return fanout.write()
+
+	def test_open(self):
+		fanout = self.connections.open(self.errors.append)
+
+		self.assertEqual(self.write(fanout), 2)
+		self.wait_for_writes(2)
+		self.assertEqual([(c.red, c.green, c.blue) for c in self.server.devices[1].colors], [(255, 0, 0)] * 5)
+		self.assertEqual(self.errors, [])
+
+	def test_recover_after_dropped_connections(self):
+		fanout = self.connections.open(self.errors.append)
+		clients = list(fanout.clients)
+		self.write(fanout)
+		self.wait_for_writes(2)
+		self.server.drop_connections()
+		fanout = self.connections.recover(self.errors.append)
+
+		# The same clients, reconnected.
+		self.assertEqual(fanout.clients, clients)
+		self.assertEqual(self.write(fanout), 2)
+		self.wait_for_writes(4)
+
+	def test_recover_from_a_restarted_server(self):
+		fanout = self.connections.open(self.errors.append)
+		port = self.server.port
+		self.server.stop()
+		self.server = self.start_server(port)
+
+		fanout = self.connections.recover(self.errors.append)
+
+		self.assertEqual(self.write(fanout), 2)
+		self.wait_for_writes(2)
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,86 @@
+import unittest
+
+import config
+import filters
+
+class RingTest(unittest.TestCase):
+	def test_keeps_the_newest(self):
+		r = filters.Ring(3)
+
+		for v in (1, 2, 3, 4, 5):
+			r.push(v)
+
+		self.assertEqual(list(r), [3, 4, 5])
+		self.assertEqual(len(r), 3)
+
+		r.clear()
+		self.assertEqual(list(r), [])
+
+	def test_needs_room(self):
+		with self.assertRaises(ValueError):
+			filters.Ring(0)
+
+class FilterTest(unittest.TestCase):
+	def test_median_drops_spikes(self):
+		m = filters.Median(3)
+
+		self.assertEqual([m(v) for v in (50, 52, 90, 51, 51)], [50, 51, 52, 52, 51])
+
+	def test_ema(self):
+		e = filters.EMA(0.5)
+
+		self.assertEqual([e(v) for v in (40, 60, 60)], [40, 50, 55])
+
+		e.reset()
+		self.assertEqual(e(10), 10)
+
+		with self.assertRaises(ValueError):
+			filters.EMA(0)
+
+	def test_hysteresis_holds_within_band(self):
+		h = filters.Hysteresis(0.5)
+
+		self.assertEqual([h(v) for v in (50, 50.4, 49.6, 50.6, 50.2)], [50, 50, 50, 50.6, 50.6])
+
+	def test_chain_applies_in_order(self):
+		chain = filters.build_chain(config.DEFAULT_FILTERS)
+
+		self.assertEqual([chain(v) for v in (50, 50.3, 80, 50.2, 51.2)], [50, 50, 50, 50, 51.2])
+
+		chain.reset()
+		self.assertEqual(chain(20), 20)
+
+	def test_unknown_type(self):
+		with self.assertRaisesRegex(ValueError, "unknown filter type"):
+			filters.build_chain([{'type': 'kalman'}])
+
+class SensorFiltersTest(unittest.TestCase):
+	def test_per_sensor_chains(self):
+		cfg = config.parse({'sensors': {
+			'raw': {'type': 'memory'},
+			'smooth': {'type': 'memory', 'filters': [{'type': 'ema', 'alpha': 0.5}]},
+		}})
+		sf = filters.SensorFilters(cfg.sensors)
+
+		sf.apply({'raw': 10, 'smooth': 10})
+		self.assertEqual(sf.apply({'raw': 20, 'smooth': 20}), {'raw': 20, 'smooth': 15})
+
+		# Sensors missing from a pass are left alone.
+		self.assertEqual(sf.apply({'smooth': 25}), {'smooth': 20})
+
+	def test_reset(self):
+		cfg = config.parse({'sensors': {
+			'a': {'type': 'memory', 'filters': [{'type': 'ema', 'alpha': 0.5}]},
+			'b': {'type': 'memory', 'filters': [{'type': 'ema', 'alpha': 0.5}]},
+		}})
+		sf = filters.SensorFilters(cfg.sensors)
+		sf.apply({'a': 10, 'b': 10})
+
+		sf.reset(['a'])
+		self.assertEqual(sf.apply({'a': 30, 'b': 30}), {'a': 30, 'b': 20})
+
+		sf.reset()
+		self.assertEqual(sf.apply({'a': 0, 'b': 0}), {'a': 0, 'b': 0})
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,97 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import color
+import lut
+import quadrature
+
+def ramp(t: float) -> lut.RGB:
+	return t, 1 - t, 0.5
+
+class GradientLUTTest(unittest.TestCase):
+	def setUp(self):
+		tmp = tempfile.TemporaryDirectory()
+		self.addCleanup(tmp.cleanup)
+		self.path = os.path.join(tmp.name, 'gradient.lut')
+
+	def test_lookup_interpolates_and_clamps(self):
+		table = lut.GradientLUT(ramp, steps=4)
+
+		self.assertEqual(table.lookup_rgb(0.125), (0.125, 0.875, 0.5))
+		self.assertEqual(table.lookup_rgb(-1), (0.0, 1.0, 0.5))
+		self.assertEqual(table.lookup_rgb(2), (1.0, 0.0, 0.5))
+		self.assertEqual(table.lookup(1), (255, 0, 127))
+
+	def test_save_and_load(self):
+		built = lut.GradientLUT(lut.blackbody_rgb, steps=50)
+		built.save(self.path)
+		loaded = lut.GradientLUT.load(self.path, lut.blackbody_rgb, steps=50)
+
+		for t in (0, 0.33, 0.5, 1):
+			self.assertEqual(loaded.lookup_rgb(t), built.lookup_rgb(t))
+
+	def assertStale(self, fn, steps: int = 50, lo: float = 0.0, hi: float = 1.0):
+		with self.assertRaises(ValueError):
+			lut.GradientLUT.load(self.path, fn, steps, lo, hi)
+
+	def test_parameters_invalidate(self):
+		lut.GradientLUT(lut.blackbody_rgb, steps=50).save(self.path)
+
+		self.assertStale(lut.blackbody_rgb._replace(gamma_correct=True))
+		self.assertStale(lut.blackbody_rgb._replace(temp_max=6500))
+		self.assertStale(lut.blackbody_rgb._replace(quadrature='reduced:21'))
+		self.assertStale(lut.blackbody_rgb, steps=51)
+		self.assertStale(lut.blackbody_rgb, hi=2.0)
+		self.assertStale(ramp)
+
+	def test_matching_functions_invalidate(self):
+		lut.GradientLUT(lut.blackbody_rgb, steps=50).save(self.path)
+		cmf = list(color.CIE_COLOR_MATCH)
+		cmf[40] = (0.4334, 0.9950, 0.0087)
+
+		with mock.patch.object(color, 'CIE_COLOR_MATCH', tuple(cmf)):
+			self.assertStale(lut.blackbody_rgb)
+
+	def test_quadrature_weights_invalidate(self):
+		fn = lut.blackbody_rgb._replace(quadrature='reduced:21')
+		lut.GradientLUT(fn, steps=50).save(self.path)
+		lut.GradientLUT.load(self.path, fn, steps=50)
+
+		quad = quadrature.get('reduced:21')
+		weights = list(quad.weights)
+		weights[0] = (weights[0][0] * 2, weights[0][1], weights[0][2])
+
+		with mock.patch.object(quad, 'weights', tuple(weights)):
+			self.assertStale(fn)
+
+	def test_locus_fit_invalidates(self):
+		fn = lut.blackbody_rgb._replace(quadrature='planckian')
+		lut.GradientLUT(fn, steps=50).save(self.path)
+		lut.GradientLUT.load(self.path, fn, steps=50)
+
+		with mock.patch.object(color, '_LOCUS_X', color._LOCUS_X[:2] + ((0, (0.25, -0.83, 1.06, 0.17)),)):
+			self.assertStale(fn)
+
+	def test_damaged_files_are_rebuilt(self):
+		with open(self.path, 'wb') as f:
+			f.write(b'OTGRAD\0\0' + bytes(100))
+
+		self.assertStale(lut.blackbody_rgb)
+
+		table = lut.GradientLUT.load_or_build(lut.blackbody_rgb, self.path, steps=50)
+		self.assertEqual(lut.GradientLUT.load(self.path, lut.blackbody_rgb, steps=50).lookup_rgb(0.5), table.lookup_rgb(0.5))
+
+	def test_variants_get_their_own_files(self):
+		names = {
+			lut.cache_name('blackbody', lut.blackbody_rgb),
+			lut.cache_name('blackbody', lut.blackbody_rgb._replace(gamma_correct=True)),
+			lut.cache_name('blackbody', lut.blackbody_rgb._replace(quadrature='planckian')),
+		}
+
+		self.assertEqual(len(names), 3)
+		self.assertEqual(lut.cache_name('blackbody', lut.blackbody_rgb), lut.cache_name('blackbody', lut.Blackbody(*lut.blackbody_rgb)))
+
+if __name__ == '__main__':
+	unittest.main()
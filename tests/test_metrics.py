@@ -0,0 +1,86 @@
+import os
+import socket
+import tempfile
+import unittest
+import urllib.request
+
+import metrics
+
+class RenderTest(unittest.TestCase):
+	def test_counters_and_gauges(self):
+		m = metrics.Metrics()
+		m.describe('frames_total', 'counter', "Frames rendered.")
+		m.inc('frames_total', result='sent')
+		m.inc('frames_total', 2, result='sent')
+		m.inc('frames_total', result='skipped')
+		m.set('sensor_reading', 52.5, sensor='cpu')
+		m.set('sensor_reading', 48.0, sensor='cpu')
+
+		self.assertEqual(m.render(), (
+			'# HELP frames_total Frames rendered.\n'
+			'# TYPE frames_total counter\n'
+			'frames_total{result="sent"} 3\n'
+			'frames_total{result="skipped"} 1\n'
+			'# TYPE sensor_reading gauge\n'
+			'sensor_reading{sensor="cpu"} 48.0\n'
+		))
+
+	def test_histogram(self):
+		m = metrics.Metrics()
+
+		for v in (0.0002, 0.003, 0.003, 7):
+			m.observe('write_seconds', v)
+
+		lines = m.render().splitlines()
+
+		self.assertEqual(lines[0], '# TYPE write_seconds histogram')
+		self.assertIn('write_seconds_bucket{le="0.00025"} 1', lines)
+		self.assertIn('write_seconds_bucket{le="0.0025"} 1', lines)
+		self.assertIn('write_seconds_bucket{le="0.005"} 3', lines)
+		self.assertIn('write_seconds_bucket{le="2.5"} 3', lines)
+		self.assertIn('write_seconds_bucket{le="+Inf"} 4', lines)
+		self.assertIn('write_seconds_count 4', lines)
+		self.assertEqual(m.get('write_seconds').sum, 0.0002 + 0.003 + 0.003 + 7)
+
+	def test_label_values_are_escaped(self):
+		m = metrics.Metrics()
+		m.set('sensor_reading', 1, sensor='a "b" \\c\nd')
+
+		self.assertIn('sensor_reading{sensor="a \\"b\\" \\\\c\\nd"} 1', m.render())
+
+class ServeTest(unittest.TestCase):
+	def test_addresses(self):
+		self.assertIsNone(metrics._unix_path('127.0.0.1:9109'))
+		self.assertIsNone(metrics._unix_path(':9109'))
+		self.assertIsNone(metrics._unix_path('[::1]:9109'))
+		self.assertEqual(metrics._unix_path('metrics.sock'), 'metrics.sock')
+		self.assertEqual(metrics._unix_path('/run/temperature:metrics'), '/run/temperature:metrics')
+		self.assertEqual(metrics._unix_path('unix:9109'), '9109')
+
+	def test_http(self):
+		m = metrics.Metrics()
+		m.inc('frames_total')
+		server = metrics.serve(m, '127.0.0.1:0')
+		self.addCleanup(server.server_close)
+		self.addCleanup(server.shutdown)
+
+		with urllib.request.urlopen(f'http://127.0.0.1:{server.server_address[1]}/metrics') as r:
+			self.assertIn('frames_total 1', r.read().decode())
+
+	def test_unix_socket(self):
+		tmp = tempfile.TemporaryDirectory()
+		self.addCleanup(tmp.cleanup)
+		path = os.path.join(tmp.name, 'metrics.sock')
+
+		m = metrics.Metrics()
+		m.inc('frames_total')
+		server = metrics.serve(m, 'unix:' + path)
+		self.addCleanup(server.server_close)
+		self.addCleanup(server.shutdown)
+
+		with socket.socket(socket.AF_UNIX) as s:
+			s.connect(path)
+			self.assertIn(b'frames_total 1', s.makefile('rb').read())
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,122 @@
+import time
+import unittest
+import unittest.mock
+
+from openrgb import OpenRGBClient
+
+import fakeserver
+import output
+
+class Clock:
+	def __init__(self):
+		self.now = 100.0
+
+	def __call__(self) -> float:
+		return self.now
+
+class FrameBufferTest(unittest.TestCase):
+	def test_fill(self):
+		frame = output.FrameBuffer(2)
+		frame.fill([1, 0.5, 0, 0.2, 0.4, 0.6])
+
+		self.assertEqual(frame.data, bytearray([255, 127, 0, 0, 51, 102, 153, 0]))
+		self.assertEqual(frame[1], (51, 102, 153))
+
+	def test_fill_clamps(self):
+		frame = output.FrameBuffer(2)
+		frame.fill([1.2, -0.1, 0.5, 2, 1, -3])
+
+		self.assertEqual([frame[0], frame[1]], [(255, 0, 127), (255, 255, 0)])
+
+	def test_long_zones_fill_the_same(self):
+		leds = output.NUMPY_MIN_LEDS + 1
+		rgb = [(i % 37) / 30 - 0.1 for i in range(3 * leds)]
+		packet = bytearray(8 + 4 * leds)
+		long = output.FrameBuffer(leds, memoryview(packet)[8:])
+		long.fill(rgb)
+
+		with unittest.mock.patch.object(output, 'NUMPY_MIN_LEDS', leds + 1):
+			short = output.FrameBuffer(leds)
+
+		short.fill(rgb)
+
+		self.assertEqual(bytes(long.data), bytes(short.data))
+		self.assertEqual(packet[:8], bytes(8))
+		self.assertEqual([long[0], long[12]], [(0, 0, 0), (255, 0, 0)])
+
+class SdkTest(unittest.TestCase):
+	"""Writes through a real client connection to a fakeserver."""
+
+	def setUp(self):
+		self.server = fakeserver.FakeServer().start()
+		self.addCleanup(self.server.stop)
+
+		self.client = OpenRGBClient(port=self.server.port, name='test')
+		self.addCleanup(self.client.disconnect)
+
+		# The Motherboard's second zone: its LEDs start after the first's one.
+		self.device = self.server.devices[0]
+		self.zone = self.client.devices[0].zones[1]
+		self.clock = Clock()
+
+	def wait_for_writes(self, n: int):
+		deadline = time.monotonic() + 5
+
+		while self.server.stats['zone_writes'] < n:
+			if time.monotonic() > deadline:
+				self.fail(f"server saw {self.server.stats['zone_writes']} zone writes, expected {n}")
+
+			time.sleep(0.001)
+
+	def test_packet_layout(self):
+		packet = output.ZonePacket(self.zone)
+
+		for i in range(6):
+			packet.frame.data[4 * i:4 * i + 3] = bytes([i, 10 * i, 255 - i])
+
+		packet.send()
+		self.wait_for_writes(1)
+
+		self.assertEqual([(c.red, c.green, c.blue) for c in self.device.colors], [(0, 0, 0)] + [(i, 10 * i, 255 - i) for i in range(6)])
+
+	def test_writer_skips_unchanged_frames(self):
+		writer = output.ZoneWriter(self.zone, threshold=10, clock=self.clock)
+		writer.frame.fill([0.5] * 18)
+
+		self.assertTrue(writer.write())
+		self.assertFalse(writer.write())
+
+		# A barely visible change stays within the threshold...
+		writer.frame.data[0] += 1
+		self.assertFalse(writer.write())
+
+		# ...a bigger one does not.
+		writer.frame.data[4] = 0
+		self.assertTrue(writer.write())
+
+		self.wait_for_writes(2)
+		self.assertEqual((writer.sent, writer.skipped), (2, 2))
+		self.assertEqual(self.device.colors[2].red, 0)
+
+	def test_writer_refreshes(self):
+		writer = output.ZoneWriter(self.zone, refresh=30.0, clock=self.clock)
+
+		self.assertTrue(writer.write())
+		self.clock.now += 29
+		self.assertFalse(writer.write())
+		self.clock.now += 1
+		self.assertTrue(writer.write())
+
+		writer.reset()
+		self.assertTrue(writer.write())
+
+		self.wait_for_writes(3)
+
+	def test_writer_checks_size(self):
+		writer = output.ZoneWriter(self.zone, clock=self.clock)
+
+		with self.assertRaises(IndexError):
+			writer.write(output.FrameBuffer(5))
+
+if __name__ == '__main__':
+	unittest.main()
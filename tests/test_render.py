@@ -0,0 +1,112 @@
+from array import array
+import unittest
+
+import render
+
+class GrayLUT:
+	"""Maps t to the gray (t, t, t)."""
+
+	def lookup_rgb(self, t: float) -> render.RGB:
+		t = min(max(t, 0.0), 1.0)
+		return t, t, t
+
+def leds(buf: array) -> list:
+	return [tuple(buf[i:i + 3]) for i in range(0, len(buf), 3)]
+
+class SceneTest(unittest.TestCase):
+	def test_layers_stack_in_order(self):
+		scene = render.Scene(4, [
+			render.Solid((0.5, 0.0, 0.0)),
+			render.SensorColor('cpu', GrayLUT(), start=1, count=2),
+			render.Solid((0.0, 0.0, 1.0), start=3, count=5),
+		])
+
+		self.assertEqual(leds(scene.render({'cpu': 0.25}, 0.0)), [
+			(0.5, 0.0, 0.0), (0.25, 0.25, 0.25), (0.25, 0.25, 0.25), (0.0, 0.0, 1.0),
+		])
+		self.assertFalse(scene.animated)
+
+	def test_each_frame_starts_blank(self):
+		scene = render.Scene(2, [render.SensorColor('cpu', GrayLUT(), count=1)])
+		buf = scene.render({'cpu': 1.0}, 0.0)
+
+		self.assertIs(scene.render({'cpu': 0.5}, 0.0), buf)
+		self.assertEqual(leds(buf), [(0.5, 0.5, 0.5), (0.0, 0.0, 0.0)])
+
+	def test_gradient(self):
+		scene = render.Scene(3, [render.Gradient(GrayLUT(), 0.0, 1.0)])
+
+		self.assertEqual(leds(scene.render({}, 0.0)), [(0.0, 0.0, 0.0), (0.5, 0.5, 0.5), (1.0, 1.0, 1.0)])
+
+	def test_pulse(self):
+		scene = render.Scene(1, [render.Solid((1.0, 1.0, 1.0)), render.Pulse(period=2.0, depth=0.5)])
+
+		self.assertTrue(scene.animated)
+		self.assertEqual(leds(scene.render({}, 10.0)), [(1.0, 1.0, 1.0)])
+		self.assertEqual(leds(scene.render({}, 11.0)), [(0.5, 0.5, 0.5)])
+
+		with self.assertRaises(ValueError):
+			render.Pulse(period=0)
+
+class MeterTest(unittest.TestCase):
+	def setUp(self):
+		self.scene = render.Scene(5, [render.Meter('cpu', GrayLUT(), background=(0.0, 0.0, 1.0), start=1)])
+
+	def test_partly_lit(self):
+		# 4 LEDs from 0 to 1; 0.6 lights 2.4 of them.
+		frame = leds(self.scene.render({'cpu': 0.6}, 0.0))
+
+		self.assertEqual(frame[:3], [(0.0, 0.0, 0.0), (0.0, 0.0, 0.0), (1 / 3, 1 / 3, 1 / 3)])
+		self.assertEqual(frame[4], (0.0, 0.0, 1.0))
+
+		r, g, b = frame[3]
+		self.assertAlmostEqual(r, 0.4 * 2 / 3)
+		self.assertAlmostEqual(b, 1 - 0.4 / 3)
+
+	def test_limits(self):
+		self.assertEqual(leds(self.scene.render({'cpu': -1}, 0.0))[1:], [(0.0, 0.0, 1.0)] * 4)
+		self.assertEqual(leds(self.scene.render({'cpu': 2}, 0.0))[1:], [(i / 3, i / 3, i / 3) for i in range(4)])
+
+class InterpolatorTest(unittest.TestCase):
+	def test_glides_over_one_interval(self):
+		s = render.Interpolator()
+		s.update(10.0, 0.0)
+
+		self.assertEqual(s.value(5.0), 10.0)
+		self.assertTrue(s.settled(5.0))
+
+		s.update(20.0, 1.0)
+
+		self.assertEqual(s.value(1.0), 10.0)
+		self.assertEqual(s.value(1.5), 15.0)
+		self.assertEqual(s.value(3.0), 20.0)
+		self.assertFalse(s.settled(1.5))
+		self.assertTrue(s.settled(2.0))
+
+	def test_update_midway_starts_from_the_shown_value(self):
+		s = render.Interpolator()
+		s.update(0.0, 0.0)
+		s.update(10.0, 1.0)
+		s.update(0.0, 1.5)
+
+		# From 5, where it was, back to 0 over the last interval of 0.5 s.
+		self.assertEqual(s.value(1.5), 5.0)
+		self.assertEqual(s.value(1.75), 2.5)
+		self.assertEqual(s.value(2.0), 0.0)
+
+class BuildLayersTest(unittest.TestCase):
+	def test_from_config(self):
+		layers = render.build_layers([
+			{'type': 'solid', 'color': [255, 0, 51], 'count': 2},
+			{'type': 'meter', 'source': 'cpu', 'background': [0, 0, 255]},
+			{'type': 'pulse', 'period': 4, 'source': 'cpu'},
+		], GrayLUT())
+
+		self.assertEqual([type(l) for l in layers], [render.Solid, render.Meter, render.Pulse])
+		self.assertEqual(layers[0].color, (1.0, 0.0, 0.2))
+		self.assertEqual((layers[0].start, layers[0].count), (0, 2))
+		self.assertEqual(layers[1].background, (0.0, 0.0, 1.0))
+		self.assertEqual(layers[2].period, 4)
+
+if __name__ == '__main__':
+	unittest.main()
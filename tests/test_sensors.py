@@ -0,0 +1,276 @@
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+from typing import Dict, List
+
+import config
+import sensors
+
+def write(path: str, text: str):
+	os.makedirs(os.path.dirname(path), exist_ok=True)
+
+	with open(path, 'w') as f:
+		f.write(text)
+
+def parse_sensors(raw: Dict[str, dict]) -> Dict[str, config.SensorConfig]:
+	return config.parse({'sensors': raw}).sensors
+
+class FakeNvml:
+	"""Stands in for pynvml, with one GPU per entry of TEMPS."""
+
+	NVML_TEMPERATURE_GPU = 0
+
+	def __init__(self, temps: List[int]):
+		self.temps = temps
+		self.initialized = False
+
+	def nvmlInit(self):
+		self.initialized = True
+
+	def nvmlShutdown(self):
+		self.initialized = False
+
+	def nvmlDeviceGetHandleByIndex(self, index: int) -> int:
+		return index
+
+	def nvmlDeviceGetTemperature(self, handle: int, sensor: int) -> int:
+		return self.temps[handle]
+
+class Clock:
+	def __init__(self):
+		self.now = 100.0
+
+	def __call__(self) -> float:
+		return self.now
+
+class HwmonTest(unittest.TestCase):
+	def setUp(self):
+		tmp = tempfile.TemporaryDirectory()
+		self.addCleanup(tmp.cleanup)
+		self.root = tmp.name
+
+		write(os.path.join(self.root, 'hwmon0', 'name'), 'nvme\n')
+		write(os.path.join(self.root, 'hwmon0', 'temp1_label'), 'Composite\n')
+		write(os.path.join(self.root, 'hwmon0', 'temp1_input'), '38850\n')
+		# Some drivers keep their attributes under device/.
+		write(os.path.join(self.root, 'hwmon1', 'device', 'name'), 'zenpower\n')
+		write(os.path.join(self.root, 'hwmon1', 'device', 'temp1_label'), 'Tctl\n')
+		write(os.path.join(self.root, 'hwmon1', 'device', 'temp1_input'), '61000\n')
+		write(os.path.join(self.root, 'hwmon1', 'device', 'temp2_label'), 'Tdie\n')
+		write(os.path.join(self.root, 'hwmon1', 'device', 'temp2_input'), '52125\n')
+
+		self.sensors = parse_sensors({
+			'cpu': {'chip': 'zenpower', 'label': 'Tdie'},
+			'ssd': {'chip': 'nvme', 'label': 'Composite'},
+		})
+
+	def test_resolve(self):
+		self.assertEqual(sensors.resolve('zenpower', 'Tdie', self.root), os.path.join(self.root, 'hwmon1', 'device', 'temp2_input'))
+
+		with self.assertRaisesRegex(LookupError, "no sensor labelled 'Tccd1'"):
+			sensors.resolve('zenpower', 'Tccd1', self.root)
+
+	def test_read_all(self):
+		reader = sensors.HwmonReader(self.sensors, self.root)
+		self.addCleanup(reader.close)
+
+		self.assertEqual(reader.read_all(), {'cpu': 52.125, 'ssd': 38.85})
+
+		write(os.path.join(self.root, 'hwmon1', 'device', 'temp2_input'), '60500\n')
+		self.assertEqual(reader.read_one('cpu'), 60.5)
+
+	def test_renumbered_chip_is_found_again(self):
+		reader = sensors.HwmonReader(self.sensors, self.root)
+		self.addCleanup(reader.close)
+
+		# The driver is reloaded: the old file stops giving readings and the
+		#   chip comes back under another number.
+		old = os.path.join(self.root, 'hwmon1')
+		write(os.path.join(old, 'device', 'temp2_input'), '')
+		os.rename(old, os.path.join(self.root, 'hwmon4'))
+		write(os.path.join(self.root, 'hwmon4', 'device', 'temp2_input'), '70000\n')
+
+		self.assertEqual(reader.read_one('cpu'), 70.0)
+
+	def test_missing_sensor(self):
+		with self.assertRaises(LookupError):
+			sensors.HwmonReader(parse_sensors({'gpu': {'chip': 'amdgpu', 'label': 'edge'}}), self.root)
+
+class ProcTest(unittest.TestCase):
+	def setUp(self):
+		tmp = tempfile.TemporaryDirectory()
+		self.addCleanup(tmp.cleanup)
+		self.root = tmp.name
+		self.clock = Clock()
+
+	def stat(self, *cpus):
+		write(os.path.join(self.root, 'stat'), ''.join(f'{name} {" ".join(map(str, times))}\n' for name, times in cpus) + 'intr 1 2 3\n')
+
+	def test_cpu_load(self):
+		self.stat(('cpu', (100, 0, 100, 800, 0, 0, 0, 0)), ('cpu0', (50, 0, 50, 400, 0, 0, 0, 0)))
+		load = sensors.CpuLoad(parse_sensors({'all': {'type': 'cpu_load'}, 'core': {'type': 'cpu_load', 'cpu': 'cpu0'}}), self.root)
+
+		# 75 of 100 jiffies busy overall; all 50 idle (incl. iowait) on cpu0.
+		self.stat(('cpu', (150, 0, 125, 820, 5, 0, 0, 0)), ('cpu0', (50, 0, 50, 440, 10, 0, 0, 0)))
+		self.assertEqual(load.read_all(), {'all': 75.0, 'core': 0.0})
+
+	def test_cpu_load_unknown_cpu(self):
+		self.stat(('cpu', (1, 0, 1, 8, 0, 0, 0, 0)))
+
+		with self.assertRaisesRegex(LookupError, "no 'cpu7'"):
+			sensors.CpuLoad(parse_sensors({'core': {'type': 'cpu_load', 'cpu': 'cpu7'}}), self.root)
+
+	def test_memory(self):
+		write(os.path.join(self.root, 'meminfo'), 'MemTotal:       16000000 kB\nMemFree:         1000000 kB\nMemAvailable:    4000000 kB\n')
+		memory = sensors.MemoryUsage(parse_sensors({'ram': {'type': 'memory'}}), self.root)
+
+		self.assertEqual(memory.read_all(), {'ram': 75.0})
+
+	def test_disk(self):
+		def diskstats(read: int, written: int):
+			write(os.path.join(self.root, 'diskstats'), f' 259       0 nvme0n1 100 0 {read} 0 50 0 {written} 0 0 0 0\n   8       0 sda 1 0 8 0 1 0 8 0 0 0 0\n')
+
+		diskstats(2000, 4000)
+		disk = sensors.DiskThroughput(parse_sensors({
+			'both': {'type': 'disk', 'device': 'nvme0n1'},
+			'read': {'type': 'disk', 'device': 'nvme0n1', 'direction': 'read'},
+		}), self.root, self.clock)
+
+		# 10000 sectors read and 30000 written over 2 s.
+		diskstats(12000, 34000)
+		self.clock.now += 2
+
+		self.assertEqual(disk.read_all(), {'both': 40000 * 512 / 1e6 / 2, 'read': 10000 * 512 / 1e6 / 2})
+
+	def test_net(self):
+		def netdev(rx: int, tx: int):
+			write(os.path.join(self.root, 'net', 'dev'),
+				'Inter-|   Receive                            |  Transmit\n'
+				' face |bytes    packets errs drop fifo frame compressed multicast|bytes    packets errs drop fifo colls carrier compressed\n'
+				'    lo: 500 5 0 0 0 0 0 0 500 5 0 0 0 0 0 0\n'
+				f'  eth0: {rx} 10 0 0 0 0 0 0 {tx} 10 0 0 0 0 0 0\n')
+
+		netdev(1000000, 0)
+		net = sensors.NetThroughput(parse_sensors({'down': {'type': 'net', 'interface': 'eth0', 'direction': 'rx'}}), self.root, self.clock)
+
+		self.assertEqual(net.read_all(), {'down': 0.0})
+
+		netdev(6000000, 0)
+		self.clock.now += 0.5
+
+		self.assertEqual(net.read_all(), {'down': 10.0})
+
+		# Counters that went backwards (an interface reset) read as idle.
+		netdev(0, 0)
+		self.clock.now += 0.5
+
+		self.assertEqual(net.read_all(), {'down': 0.0})
+
+class NvmlTest(unittest.TestCase):
+	def test_read_all(self):
+		nvml = FakeNvml([61, 48])
+		gpus = sensors.NvmlTemperatures(parse_sensors({'first': {'type': 'nvml'}, 'second': {'type': 'nvml', 'index': 1}}), nvml)
+
+		self.assertTrue(nvml.initialized)
+		self.assertEqual(gpus.read_all(), {'first': 61.0, 'second': 48.0})
+
+		gpus.close()
+		self.assertFalse(nvml.initialized)
+
+class SensorsTest(unittest.TestCase):
+	def setUp(self):
+		tmp = tempfile.TemporaryDirectory()
+		self.addCleanup(tmp.cleanup)
+		self.root = tmp.name
+		self.clock = Clock()
+
+	def meminfo(self, available: int):
+		write(os.path.join(self.root, 'meminfo'), f'MemTotal: 1000 kB\nMemAvailable: {available} kB\n')
+
+	def netdev(self, *ifaces):
+		write(os.path.join(self.root, 'net', 'dev'), 'h\nh\n' + ''.join(f'{i}: 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0 0\n' for i in ifaces))
+
+	def test_one_source_per_type(self):
+		self.meminfo(250)
+		reader = sensors.Sensors(parse_sensors({
+			'ram': {'type': 'memory'},
+			'gpu': {'type': 'nvml'},
+		}), memory={'root': self.root}, nvml={'nvml': FakeNvml([55])})
+		self.addCleanup(reader.close)
+
+		self.assertEqual(sorted(type(s).__name__ for s in reader.sources), ['MemoryUsage', 'NvmlTemperatures'])
+		self.assertEqual(reader.read_all(), {'ram': 75.0, 'gpu': 55.0})
+
+	def test_failing_source_keeps_last_readings(self):
+		self.meminfo(250)
+		self.netdev('eth0')
+		reader = sensors.Sensors(parse_sensors({
+			'ram': {'type': 'memory'},
+			'net': {'type': 'net', 'interface': 'eth0'},
+		}), memory={'root': self.root}, net={'root': self.root, 'clock': self.clock})
+		self.addCleanup(reader.close)
+
+		self.assertEqual(reader.read_all(), {'ram': 75.0, 'net': 0.0})
+
+		# The interface goes away; the other source keeps being read.
+		self.netdev()
+		self.meminfo(500)
+		out = io.StringIO()
+
+		with contextlib.redirect_stdout(out):
+			self.assertEqual(reader.read_all(), {'ram': 50.0, 'net': 0.0})
+			self.assertEqual(reader.read_all(), {'ram': 50.0, 'net': 0.0})
+
+		self.assertEqual(out.getvalue().count("no network interface 'eth0'"), 1)
+		self.assertEqual(reader.recovered, [])
+
+		self.netdev('eth0')
+
+		with contextlib.redirect_stdout(out):
+			reader.read_all()
+
+		self.assertEqual(reader.recovered, ['net'])
+		self.assertIn("reading net works again", out.getvalue())
+
+class AdaptiveIntervalTest(unittest.TestCase):
+	def test_backs_off_while_steady(self):
+		pacing = sensors.AdaptiveInterval(0.1, 1.0, 1.0)
+
+		self.assertEqual(pacing.update({'cpu': 50}, 0.0), 0.1)
+		self.assertAlmostEqual(pacing.update({'cpu': 50}, 0.1), 0.15)
+		self.assertAlmostEqual(pacing.update({'cpu': 50.1}, 0.25), 0.225)
+
+		for t in range(1, 10):
+			interval = pacing.update({'cpu': 50.1}, t)
+
+		self.assertEqual(interval, 1.0)
+
+	def test_speeds_up_on_fast_change(self):
+		pacing = sensors.AdaptiveInterval(0.1, 1.0, 1.0)
+		pacing.update({'cpu': 50}, 0.0)
+		pacing.update({'cpu': 50}, 5.0)
+
+		self.assertEqual(pacing.update({'cpu': 55}, 6.0), 0.1)
+
+	def test_rates_are_relative_to_each_sensor(self):
+		cfg = parse_sensors({
+			'cpu': {'type': 'cpu_load', 'min': 0, 'max': 100},
+			'net': {'type': 'net', 'interface': 'eth0', 'min': 0, 'max': 100},
+			'temp': {'type': 'memory', 'min': 30, 'max': 100, 'fast_rate': 0.1},
+		})
+		pacing = sensors.AdaptiveInterval(0.1, 1.0, 0.015, cfg)
+		pacing.update({'cpu': 3, 'net': 0.5, 'temp': 40}, 0.0)
+
+		# 1 % and 0.8 MB/s per second, out of 100 each, are slow...
+		self.assertAlmostEqual(pacing.update({'cpu': 4, 'net': 1.3, 'temp': 40}, 1.0), 0.15)
+
+		# ...as is 5 °C per second, for a sensor that allows 7.
+		self.assertAlmostEqual(pacing.update({'cpu': 4, 'net': 1.3, 'temp': 45}, 2.0), 0.225)
+
+		# 2 MB/s per second is not.
+		self.assertEqual(pacing.update({'cpu': 4, 'net': 3.3, 'temp': 45}, 3.0), 0.1)
+
+if __name__ == '__main__':
+	unittest.main()
@@ -0,0 +1,41 @@
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def run(code: str, **env: str) -> str:
+	return subprocess.run([sys.executable, '-c', code], cwd=ROOT, env=dict(os.environ, **env), check=True, capture_output=True, text=True).stdout
+
+class ImportTest(unittest.TestCase):
+	def setUp(self):
+		tmp = tempfile.TemporaryDirectory()
+		self.addCleanup(tmp.cleanup)
+		self.cache = tmp.name
+
+	def test_colors_without_openrgb_or_disk(self):
+		out = run(
+			'import sys, temperature\n'
+			'print(temperature.blackbody_lut(persist=False).lookup(0.5))\n'
+			'print(any(m.split(".")[0] == "openrgb" for m in sys.modules))\n',
+			XDG_CACHE_HOME=self.cache,
+		)
+
+		self.assertEqual(out.splitlines()[1], 'False')
+		self.assertEqual(os.listdir(self.cache), [])
+
+	def test_cache_can_be_turned_off(self):
+		run('import temperature; temperature.blackbody_lut().lookup(0.5)', XDG_CACHE_HOME=self.cache, TEMPERATURE_LUT_CACHE='off')
+
+		self.assertEqual(os.listdir(self.cache), [])
+
+	def test_cache_directory(self):
+		out = run('import temperature; print(temperature.blackbody_lut().lookup(0.5) == temperature.blackbody_lut(persist=False).lookup(0.5))', TEMPERATURE_LUT_CACHE=self.cache)
+
+		self.assertEqual(out.strip(), 'True')
+		self.assertEqual(len(os.listdir(self.cache)), 1)
+
+if __name__ == '__main__':
+	unittest.main()